@@ -0,0 +1,102 @@
+import pandas as pd
+
+import armazenamento
+import cache_local
+import diagnostico
+
+# Agregados mantidos por planilha: (nome do arquivo local, granularidade, colunas somadas)
+AGREGADOS = {
+    'Abastecimentos': ('agregado_abastecimentos_diario', 'D', ['Litros', 'Valor']),
+    'Manutencoes': ('agregado_manutencoes_mensal', 'M', ['Valor']),
+}
+
+
+def _periodos(datas, granularidade):
+    if granularidade == 'D':
+        return datas.dt.normalize()
+    return datas.dt.to_period('M').dt.to_timestamp()
+
+
+# Soma as linhas por período e veículo; dropna=False mantém linhas sem data ou veículo
+# para que os totais de "Todo o período" continuem batendo com as planilhas
+def _agrupar(df, colunas):
+    agrupado = (df.groupby(['Periodo', 'Veículo'], observed=True, dropna=False)
+                .agg(**{coluna: (coluna, 'sum') for coluna in colunas + ['Registros']})
+                .reset_index())
+    agrupado['Veículo'] = agrupado['Veículo'].astype('category')
+    return agrupado.sort_values('Periodo', kind='stable', na_position='last', ignore_index=True)
+
+
+def _construir(df, worksheet):
+    _, granularidade, colunas = AGREGADOS[worksheet]
+    linhas = df[colunas].astype('float64')
+    linhas['Periodo'] = _periodos(df['Data'], granularidade)
+    linhas['Veículo'] = df['Veículo']
+    linhas['Registros'] = 1
+    return _agrupar(linhas, colunas)
+
+
+def _vazio(worksheet):
+    _, _, colunas = AGREGADOS[worksheet]
+    return pd.DataFrame({
+        'Periodo': pd.Series(dtype='datetime64[ns]'),
+        'Veículo': pd.Series(dtype='category'),
+        **{coluna: pd.Series(dtype='float64') for coluna in colunas},
+        'Registros': pd.Series(dtype='int64'),
+    })
+
+
+# Agregado vindo do banco (datas em texto) convertido para os tipos de _agrupar
+def _formatar(agregado, worksheet):
+    if agregado.empty:
+        return _vazio(worksheet)
+    _, _, colunas = AGREGADOS[worksheet]
+    agregado = agregado.astype({coluna: 'float64' for coluna in colunas} | {'Registros': 'int64'})
+    agregado['Periodo'] = pd.to_datetime(agregado['Periodo'], errors='coerce')
+    agregado['Veículo'] = agregado['Veículo'].astype('category')
+    return agregado.sort_values('Periodo', kind='stable', na_position='last', ignore_index=True)
+
+
+# Agregado da planilha correspondente à versão `versao` dos dados brutos;
+# só recalcula a partir das linhas quando a versão não bate
+@diagnostico.cronometrar('agregados.carregar', cache=True)
+def carregar(worksheet, versao, carregar_planilha):
+    nome = AGREGADOS[worksheet][0]
+    if versao is not None and cache_local.ler_metadado(nome) == versao:
+        agregado = cache_local.ler(nome)
+        if agregado is not None:
+            return agregado
+
+    diagnostico.anotar(cache=False)
+    banco = armazenamento.banco()
+    if banco is not None:
+        # Com o banco local, as somas são calculadas na própria consulta
+        agregado = _formatar(banco.agregar(worksheet, *AGREGADOS[worksheet][1:]), worksheet)
+    else:
+        df = carregar_planilha(worksheet)
+        agregado = _vazio(worksheet) if df.empty else _construir(df, worksheet)
+    cache_local.gravar(nome, agregado, sincronizado=False)
+    cache_local.gravar_metadado(nome, versao)
+    return agregado
+
+
+# Incorpora linhas recém-gravadas ao agregado, sem reler as planilhas
+def acrescentar(worksheet, novas_linhas, versao_anterior, versao_nova):
+    nome, _, colunas = AGREGADOS[worksheet]
+    agregado = None
+    if versao_anterior is not None and cache_local.ler_metadado(nome) == versao_anterior:
+        agregado = cache_local.ler(nome)
+    if agregado is None:
+        # Agregado ausente ou desatualizado: será reconstruído na próxima leitura
+        cache_local.gravar_metadado(nome, None)
+        return
+
+    if not novas_linhas.empty:
+        combinado = pd.concat([agregado, _construir(novas_linhas, worksheet)], ignore_index=True)
+        cache_local.gravar(nome, _agrupar(combinado, colunas), sincronizado=False)
+    cache_local.gravar_metadado(nome, versao_nova)
+
+
+# Descarta o agregado; será reconstruído na próxima leitura
+def invalidar(worksheet):
+    cache_local.gravar_metadado(AGREGADOS[worksheet][0], None)
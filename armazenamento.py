@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+import esquema
+
+# Onde os registros ficam: 'sheets' (Google Sheets, padrão) ou 'sqlite' (banco local)
+TIPO = os.environ.get('GERENCIADOR_ARMAZENAMENTO', 'sheets')
+
+# Arquivo do banco SQLite
+ARQUIVO_SQLITE = os.environ.get('GERENCIADOR_SQLITE', 'gerenciador.db')
+
+# Índices de cada tabela: veículo e data para as consultas por veículo e período
+_INDICES = {
+    'Veiculos': ('Nome',),
+    'Abastecimentos': ('Veículo', 'Data'),
+    'Manutencoes': ('Veiculo', 'Data'),
+}
+
+_TIPOS_SQL = {'numero': 'REAL', 'data': 'TEXT', 'categoria': 'TEXT', 'texto': 'TEXT'}
+
+# Expressões SQL do período de cada granularidade dos agregados (as datas já são
+# gravadas como AAAA-MM-DD, então o dia é a própria coluna e o agrupamento por
+# veículo e dia percorre o índice em ordem, sem ordenação temporária)
+_PERIODOS_SQL = {'D': '{coluna}', 'M': "strftime('%Y-%m-01', {coluna})"}
+
+
+def _nome(identificador):
+    return '"' + identificador.replace('"', '""') + '"'
+
+
+def _colunas(worksheet):
+    # Colunas com os nomes usados na planilha, na ordem do esquema
+    renomear = esquema.COLUNAS_PLANILHA.get(worksheet, {})
+    return [(renomear.get(coluna, coluna), tipo) for coluna, tipo in esquema.ESQUEMAS[worksheet].items()]
+
+
+# Banco SQLite local com uma tabela por planilha, nas mesmas colunas do Google Sheets.
+# Cada gravação é uma transação e incrementa a versão da tabela, usada como
+# chave dos agregados e dos cálculos memorizados
+class ArmazenamentoSQLite:
+    def __init__(self, arquivo):
+        self._arquivo = arquivo
+        with self._conectar() as conexao:
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('CREATE TABLE IF NOT EXISTS _versoes (planilha TEXT PRIMARY KEY, versao INTEGER)')
+            for worksheet in esquema.ESQUEMAS:
+                colunas = _colunas(worksheet)
+                definicao = ', '.join(f'{_nome(coluna)} {_TIPOS_SQL[tipo]}' for coluna, tipo in colunas)
+                conexao.execute(f'CREATE TABLE IF NOT EXISTS {_nome(worksheet)} ({definicao})')
+                indice = _INDICES[worksheet]
+                conexao.execute(f'CREATE INDEX IF NOT EXISTS {_nome("idx_" + worksheet)} '
+                                f'ON {_nome(worksheet)} ({", ".join(map(_nome, indice))})')
+
+    # Uma conexão por operação (as sessões do Streamlit rodam em threads diferentes);
+    # tudo o que for feito no bloco é uma transação: commit ao sair, rollback em erro
+    @contextmanager
+    def _conectar(self):
+        conexao = sqlite3.connect(self._arquivo, timeout=30)
+        try:
+            with conexao:
+                yield conexao
+        finally:
+            conexao.close()
+
+    def _versao(self, conexao, worksheet):
+        atual = conexao.execute('SELECT versao FROM _versoes WHERE planilha = ?', (worksheet,)).fetchone()
+        return atual[0] if atual else 0
+
+    def _incrementar_versao(self, conexao, worksheet):
+        # Baseada no relógio para não repetir versões de um banco recriado
+        nova = max(time.time_ns(), self._versao(conexao, worksheet) + 1)
+        conexao.execute('INSERT OR REPLACE INTO _versoes (planilha, versao) VALUES (?, ?)', (worksheet, nova))
+
+    # Os números são gravados como chegam: quem grava passa os valores originais
+    # em float64 (normalizar(..., compacto=False)), nunca os float32 do app
+    def _inserir(self, conexao, worksheet, data):
+        colunas = [coluna for coluna, _ in _colunas(worksheet)]
+        linhas = esquema.desnormalizar(data, worksheet).reindex(columns=colunas)
+        linhas = linhas.astype(object).where(linhas.notna(), None)
+        conexao.executemany(
+            f'INSERT INTO {_nome(worksheet)} ({", ".join(map(_nome, colunas))}) '
+            f'VALUES ({", ".join("?" * len(colunas))})',
+            linhas.itertuples(index=False, name=None))
+
+    # Registros da planilha, na ordem em que foram gravados e já normalizados
+    # (compacto=False mantém os números em float64, para copiá-los sem perda)
+    def ler(self, worksheet, compacto=True):
+        with self._conectar() as conexao:
+            data = pd.read_sql_query(f'SELECT * FROM {_nome(worksheet)} ORDER BY rowid', conexao)
+        return esquema.normalizar(data, worksheet, compacto)
+
+    # Registros em blocos de até `tamanho` linhas, sem carregar a tabela inteira
+    def ler_em_lotes(self, worksheet, tamanho, compacto=True):
+        with self._conectar() as conexao:
+            for data in pd.read_sql_query(f'SELECT * FROM {_nome(worksheet)} ORDER BY rowid', conexao,
+                                          chunksize=tamanho):
+                yield esquema.normalizar(data, worksheet, compacto)
+
+    # Retorna as versões antes e depois da gravação, lidas na mesma transação. A
+    # trava de escrita é tomada antes da primeira leitura (o sqlite3 só abriria a
+    # transação no INSERT), para que duas gravações simultâneas não vejam a mesma
+    # versão anterior
+    def acrescentar(self, worksheet, data):
+        with self._conectar() as conexao:
+            conexao.execute('BEGIN IMMEDIATE')
+            versao_anterior = self._versao(conexao, worksheet)
+            self._inserir(conexao, worksheet, data)
+            self._incrementar_versao(conexao, worksheet)
+            return versao_anterior, self._versao(conexao, worksheet)
+
+    # Substitui todo o conteúdo da planilha
+    def substituir(self, worksheet, data):
+        with self._conectar() as conexao:
+            conexao.execute(f'DELETE FROM {_nome(worksheet)}')
+            self._inserir(conexao, worksheet, data)
+            self._incrementar_versao(conexao, worksheet)
+
+    def atualizar_km(self, atualizacoes):
+        with self._conectar() as conexao:
+            conexao.executemany('UPDATE Veiculos SET Km_Atual = ? WHERE Nome = ?',
+                                [(float(km), nome) for nome, km in atualizacoes.items()])
+            self._incrementar_versao(conexao, 'Veiculos')
+
+    def versao(self, worksheet):
+        with self._conectar() as conexao:
+            return self._versao(conexao, worksheet)
+
+    # Somas por período e veículo calculadas no próprio banco, no formato de agregados.py
+    def agregar(self, worksheet, granularidade, colunas):
+        veiculo, data = _INDICES[worksheet]
+        periodo = _PERIODOS_SQL[granularidade].format(coluna=_nome(data))
+        somas = ', '.join(f'TOTAL({_nome(coluna)}) AS {_nome(coluna)}' for coluna in colunas)
+        consulta = (f'SELECT {periodo} AS Periodo, {_nome(veiculo)} AS "Veículo", {somas}, '
+                    f'COUNT(*) AS Registros FROM {_nome(worksheet)} GROUP BY 2, 1')
+        with self._conectar() as conexao:
+            return pd.read_sql_query(consulta, conexao)
+
+
+_trava = threading.Lock()
+_banco = None
+
+
+# Banco local em uso, ou None quando os registros ficam no Google Sheets
+def banco():
+    global _banco
+    if TIPO != 'sqlite':
+        return None
+    with _trava:
+        if _banco is None:
+            _banco = ArmazenamentoSQLite(ARQUIVO_SQLITE)
+        return _banco
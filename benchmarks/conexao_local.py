@@ -0,0 +1,84 @@
+import re
+import time
+
+import pandas as pd
+
+
+# Planilha em memória com a parte da API do gspread usada por dados.py;
+# conta as células enviadas para medir o tamanho de cada gravação
+class PlanilhaLocal:
+    def __init__(self, conexao, nome):
+        self._conexao = conexao
+        self._nome = nome
+
+    @property
+    def _df(self):
+        return self._conexao.planilhas.setdefault(self._nome, pd.DataFrame())
+
+    @property
+    def col_count(self):
+        return max(len(self._df.columns), 26)
+
+    @property
+    def row_count(self):
+        return len(self._df) + 1
+
+    def get(self, intervalo, **opcoes):
+        time.sleep(self._conexao.latencia)
+        # Apenas intervalos 'A<linha>:<coluna>[<linha>]', como os de dados.py
+        primeira, ultima = re.match(r'[A-Z]+(\d+):[A-Z]+(\d*)', intervalo).groups()
+        primeira = int(primeira)
+        df = self._df.iloc[max(primeira - 2, 0):int(ultima) - 1 if ultima else None]
+        linhas = df.astype(object).where(df.notna(), '').to_numpy().tolist()
+        return [list(df.columns)] + linhas if primeira == 1 else linhas
+
+    def row_values(self, linha):
+        return list(self._df.columns) if linha == 1 else [str(v) for v in self._df.iloc[linha - 2]]
+
+    def col_values(self, coluna):
+        return [self._df.columns[coluna - 1]] + self._df.iloc[:, coluna - 1].astype(str).tolist()
+
+    def append_row(self, valores, **opcoes):
+        self._conexao.planilhas[self._nome] = pd.DataFrame(columns=valores)
+
+    def append_rows(self, valores, **opcoes):
+        df = self._df
+        self._conexao.celulas_enviadas += sum(len(linha) for linha in valores)
+        novas = pd.DataFrame(valores, columns=df.columns)
+        self._conexao.planilhas[self._nome] = novas if df.empty else pd.concat([df, novas], ignore_index=True)
+
+    def batch_update(self, dados, **opcoes):
+        df = self._df
+        for celula in dados:
+            coluna, linha = re.match(r'([A-Z]+)(\d+)', celula['range']).groups()
+            indice_coluna = 0
+            for letra in coluna:
+                indice_coluna = indice_coluna * 26 + ord(letra) - 64
+            df.iat[int(linha) - 2, indice_coluna - 1] = celula['values'][0][0]
+            self._conexao.celulas_enviadas += 1
+
+
+class _ClienteLocal:
+    def __init__(self, conexao):
+        self._conexao = conexao
+
+    def _select_worksheet(self, worksheet=None, **opcoes):
+        return PlanilhaLocal(self._conexao, worksheet)
+
+
+# Substituto do GSheetsConnection que guarda as planilhas em DataFrames;
+# `latencia` simula o tempo de ida e volta de cada leitura
+class ConexaoLocal:
+    def __init__(self, planilhas, latencia=0.0):
+        self.planilhas = {nome: df.copy() for nome, df in planilhas.items()}
+        self.latencia = latencia
+        self.celulas_enviadas = 0
+        self.client = _ClienteLocal(self)
+
+    def read(self, worksheet=None, ttl=None, **opcoes):
+        time.sleep(self.latencia)
+        return self.planilhas.get(worksheet, pd.DataFrame()).copy()
+
+    def update(self, worksheet=None, data=None, **opcoes):
+        self.celulas_enviadas += data.size
+        self.planilhas[worksheet] = data.copy()
@@ -0,0 +1,146 @@
+# Mede tempo e pico de memória dos caminhos de dados do app com frotas sintéticas.
+#
+#   python benchmarks/executar.py                      # 1k, 100k e 1M abastecimentos
+#   python benchmarks/executar.py --linhas 1000 50000  # tamanhos escolhidos
+#   python benchmarks/executar.py --json resultado.json
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+import streamlit.logger  # noqa: E402
+
+# Fora do `streamlit run` o Streamlit avisa a cada cache usado; os avisos só poluem a saída
+streamlit.logger.set_log_level(logging.ERROR)
+
+import agregados  # noqa: E402
+import cache_local  # noqa: E402
+import consultas  # noqa: E402
+import dados  # noqa: E402
+import esquema  # noqa: E402
+import relatorio  # noqa: E402
+import transferir  # noqa: E402
+from benchmarks.conexao_local import ConexaoLocal  # noqa: E402
+from benchmarks.gerar_frota import frota_com_linhas  # noqa: E402
+from consumo import calcular_consumo  # noqa: E402
+
+for _nome in list(logging.root.manager.loggerDict):
+    if _nome.startswith('streamlit'):
+        logging.getLogger(_nome).setLevel(logging.ERROR)
+
+
+def _medir(funcao):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, duracao, pico
+
+
+def executar(linhas):
+    frota = frota_com_linhas(linhas)
+    conexao = ConexaoLocal(frota)
+    dados._conexao = lambda: conexao
+    cache_local.CACHE_DIR = tempfile.mkdtemp(prefix='bench_gerenciador_')
+    relatorio.limpar_cache()
+
+    abast_bruto = frota['Abastecimentos']
+    resultados = []
+
+    def etapa(nome, funcao):
+        resultado, duracao, pico = _medir(funcao)
+        resultados.append({'linhas': len(abast_bruto), 'etapa': nome,
+                           'segundos': duracao, 'pico_mb': pico / 2**20})
+        return resultado
+
+    # Leitura a frio das três planilhas com 200 ms de latência por leitura
+    planilhas = ['Veiculos', 'Abastecimentos', 'Manutencoes']
+    conexao.latencia = 0.2
+    etapa('load 3 planilhas (sequencial, 200 ms/leitura)',
+          lambda: [dados.load_data(worksheet) for worksheet in planilhas])
+    cache_local.invalidar()
+    etapa('load 3 planilhas (paralelo, 200 ms/leitura)', lambda: dados.load_data_many(planilhas))
+    cache_local.invalidar()
+    conexao.latencia = 0.0
+
+    etapa('load (Sheets + esquema + cópia local)', lambda: dados.load_data('Abastecimentos'))
+    abast_df = etapa('load (cópia local)', lambda: dados.load_data('Abastecimentos'))
+    dados.load_data('Manutencoes')
+
+    # Atualização com 10 linhas novas na planilha: só o delta é buscado
+    conexao.planilhas['Abastecimentos'] = pd.concat(
+        [conexao.planilhas['Abastecimentos'], abast_bruto.tail(10)], ignore_index=True)
+    abast_df = etapa('atualização incremental (10 linhas novas)',
+                     lambda: dados._sincronizar('Abastecimentos'))
+    etapa('normalize', lambda: esquema.normalizar(abast_bruto, 'Abastecimentos'))
+    etapa('consumo', lambda: calcular_consumo(abast_df))
+
+    ordenado = abast_df.sort_values('Data', kind='stable', ignore_index=True)
+    inicio = relatorio.opcoes_periodo()["Últimos 6 meses"]
+    etapa('filtro de período', lambda: relatorio._filtrar_periodo(ordenado, inicio))
+
+    versao_abast = dados.data_version('Abastecimentos')
+    versao_manut = dados.data_version('Manutencoes')
+    etapa('agregados (reconstrução)',
+          lambda: agregados.carregar('Abastecimentos', None, dados.load_data))
+    etapa('totais e séries (DuckDB sobre os agregados)', lambda: consultas.resumir(
+        agregados.carregar('Abastecimentos', versao_abast, dados.load_data),
+        agregados.carregar('Manutencoes', versao_manut, dados.load_data), inicio))
+    etapa('relatório completo', lambda: relatorio.calcular_relatorio(
+        dados.load_data, versao_abast, versao_manut, None))
+    etapa('relatório (memorizado)', lambda: relatorio.calcular_relatorio(
+        dados.load_data, versao_abast, versao_manut, None))
+
+    nova = abast_bruto.tail(1).copy()
+    conexao.celulas_enviadas = 0
+    etapa('save (1 abastecimento)', lambda: dados.append_data(
+        esquema.normalizar(nova, 'Abastecimentos'), 'Abastecimentos'))
+    resultados[-1]['celulas_enviadas'] = conexao.celulas_enviadas
+
+    # Agregados e consumo foram atualizados pelo save; o relatório não recalcula do zero
+    etapa('relatório depois do save', lambda: relatorio.calcular_relatorio(
+        dados.load_data, dados.data_version('Abastecimentos'), versao_manut, None))
+
+    # Exportação e reimportação do histórico em blocos (a planilha fica com o dobro de linhas)
+    arquivo = os.path.join(cache_local.CACHE_DIR, 'abastecimentos.csv')
+    with contextlib.redirect_stdout(io.StringIO()):
+        etapa('exportar CSV em blocos', lambda: transferir.exportar(arquivo, 'Abastecimentos'))
+        etapa('importar CSV em blocos', lambda: transferir.importar(arquivo, 'Abastecimentos'))
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos caminhos de dados do gerenciador')
+    parser.add_argument('--linhas', type=int, nargs='+', default=[1_000, 100_000, 1_000_000],
+                        help='quantidade aproximada de abastecimentos por rodada')
+    parser.add_argument('--json', help='arquivo para gravar os resultados')
+    args = parser.parse_args()
+
+    # Rodada descartada: a primeira chamada paga importações e inicialização do pyarrow
+    executar(100)
+
+    resultados = []
+    for linhas in args.linhas:
+        resultados.extend(executar(linhas))
+
+    tabela = pd.DataFrame(resultados)
+    with pd.option_context('display.max_rows', None, 'display.width', 120):
+        print(tabela.to_string(index=False, float_format=lambda valor: f'{valor:.4f}'))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
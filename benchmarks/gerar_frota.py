@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+
+# Gera Veiculos/Abastecimentos/Manutencoes sintéticos no mesmo formato em que
+# chegam do Google Sheets (datas em texto, coluna 'Veiculo' em Manutencoes)
+def gerar_frota(veiculos=10, anos=2, abastecimentos_por_mes=4, manutencoes_por_ano=3, semente=0):
+    rng = np.random.default_rng(semente)
+    nomes = np.array([f'Veículo {i:05d}' for i in range(veiculos)])
+    inicio = pd.Timestamp.now().normalize() - pd.DateOffset(years=anos)
+    dias = anos * 365
+
+    km_inicial = rng.integers(0, 100_000, veiculos).astype(float)
+    veiculos_df = pd.DataFrame({
+        'Nome': nomes,
+        'Marca': rng.choice(['Fiat', 'VW', 'Ford', 'Toyota', 'Renault'], veiculos),
+        'Km_Inicial': km_inicial,
+        'Km_Atual': km_inicial,
+        'Data_Registro': inicio.strftime('%Y-%m-%d'),
+    })
+
+    # Abastecimentos: datas ordenadas por veículo e odômetro sempre crescente
+    por_veiculo = anos * 12 * abastecimentos_por_mes
+    total = veiculos * por_veiculo
+    veiculo = np.repeat(np.arange(veiculos), por_veiculo)
+    deslocamento = np.sort(rng.integers(0, dias, (veiculos, por_veiculo)), axis=1).ravel()
+    litros = rng.uniform(20, 60, total).round(2)
+    km = km_inicial[veiculo] + np.cumsum(
+        rng.uniform(200, 700, (veiculos, por_veiculo)), axis=1).ravel().round(1)
+    preco = rng.uniform(5.0, 6.5, total).round(2)
+    abastecimentos_df = pd.DataFrame({
+        'Veículo': nomes[veiculo],
+        'Data': (inicio + pd.to_timedelta(deslocamento, unit='D')).strftime('%Y-%m-%d'),
+        'Preço': preco,
+        'Litros': litros,
+        'Valor': (preco * litros).round(2),
+        'Km_Atual': km,
+    })
+    veiculos_df['Km_Atual'] = abastecimentos_df.groupby('Veículo', sort=False)['Km_Atual'].max().to_numpy()
+
+    total_manut = veiculos * anos * manutencoes_por_ano
+    veiculo_manut = rng.integers(0, veiculos, total_manut)
+    manutencoes_df = pd.DataFrame({
+        'Veiculo': nomes[veiculo_manut],
+        'Data': (inicio + pd.to_timedelta(rng.integers(0, dias, total_manut), unit='D')).strftime('%Y-%m-%d'),
+        'Valor': rng.uniform(100, 3000, total_manut).round(2),
+        'Descricao': rng.choice(['Troca de óleo', 'Pneus', 'Freios', 'Revisão'], total_manut),
+        'Km_Atual': km_inicial[veiculo_manut] + rng.uniform(0, 50_000, total_manut).round(1),
+    })
+
+    return {'Veiculos': veiculos_df, 'Abastecimentos': abastecimentos_df, 'Manutencoes': manutencoes_df}
+
+
+# Parâmetros para chegar perto de `linhas` abastecimentos
+def frota_com_linhas(linhas, anos=2, abastecimentos_por_mes=4, semente=0):
+    veiculos = max(1, round(linhas / (anos * 12 * abastecimentos_por_mes)))
+    return gerar_frota(veiculos=veiculos, anos=anos, abastecimentos_por_mes=abastecimentos_por_mes,
+                       semente=semente)
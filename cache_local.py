@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+# Diretório onde as planilhas são espelhadas em arquivos Parquet
+CACHE_DIR = os.environ.get('GERENCIADOR_CACHE_DIR', '.cache_local')
+
+# Tempo (em segundos) em que a cópia local é considerada atualizada
+CACHE_TTL = int(os.environ.get('GERENCIADOR_CACHE_TTL', 300))
+
+_ARQUIVO_SINCRONIZACAO = '_sincronizacao.json'
+_ARQUIVO_METADADOS = '_metadados.json'
+
+# Sessões do Streamlit rodam em threads do mesmo processo
+_trava = threading.RLock()
+
+
+def _caminho(nome):
+    return os.path.join(CACHE_DIR, nome)
+
+
+def _temporario(destino):
+    return f'{destino}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+
+def _ler_json(nome):
+    try:
+        with open(_caminho(nome), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+
+def _gravar_json(nome, dados):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temporario = _temporario(_caminho(nome))
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo)
+    os.replace(temporario, _caminho(nome))
+
+
+def _ler_sincronizacao():
+    return _ler_json(_ARQUIVO_SINCRONIZACAO)
+
+
+def _gravar_sincronizacao(sincronizacao):
+    _gravar_json(_ARQUIVO_SINCRONIZACAO, sincronizacao)
+
+
+# Indica se a planilha precisa ser buscada novamente no Google Sheets
+def precisa_atualizar(worksheet, ttl=CACHE_TTL):
+    if not os.path.exists(_caminho(f'{worksheet}.parquet')):
+        return True
+    ultima = _ler_sincronizacao().get(worksheet)
+    return ultima is None or time.time() - ultima >= ttl
+
+
+def ler(worksheet):
+    try:
+        return pd.read_parquet(_caminho(f'{worksheet}.parquet'))
+    except Exception:
+        return None
+
+
+# Grava a planilha completa; sincronizado=True marca que veio do Google Sheets
+def gravar(worksheet, data, sincronizado=True):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    destino = _caminho(f'{worksheet}.parquet')
+    temporario = _temporario(destino)
+    with _trava:
+        try:
+            data.to_parquet(temporario, index=False)
+            os.replace(temporario, destino)
+        except Exception:
+            # Colunas com tipos mistos não são representáveis; descarta a cópia local
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            invalidar(worksheet)
+            return
+        if sincronizado:
+            sincronizacao = _ler_sincronizacao()
+            sincronizacao[worksheet] = time.time()
+            _gravar_sincronizacao(sincronizacao)
+
+
+# Acrescenta linhas à cópia local sem reler a planilha inteira. Com `manter`,
+# só as `manter` primeiras linhas atuais são preservadas antes das novas
+def acrescentar(worksheet, novas_linhas, manter=None, sincronizado=False):
+    with _trava:
+        atual = ler(worksheet)
+        if atual is None:
+            return
+        if manter is not None:
+            atual = atual.iloc[:manter]
+        combinado = pd.concat([atual, novas_linhas], ignore_index=True)
+        # concat de categorias diferentes vira object; restaura o tipo da cópia local
+        for coluna in atual.select_dtypes('category').columns:
+            combinado[coluna] = combinado[coluna].astype('category')
+        gravar(worksheet, combinado, sincronizado=sincronizado)
+
+
+# Marca a cópia local como recém-conferida com o Google Sheets, sem regravá-la
+def marcar_sincronizado(worksheet):
+    with _trava:
+        sincronizacao = _ler_sincronizacao()
+        sincronizacao[worksheet] = time.time()
+        _gravar_sincronizacao(sincronizacao)
+
+
+def invalidar(worksheet=None):
+    with _trava:
+        sincronizacao = _ler_sincronizacao()
+        for nome in [worksheet] if worksheet else list(sincronizacao):
+            sincronizacao.pop(nome, None)
+            try:
+                os.remove(_caminho(f'{nome}.parquet'))
+            except OSError:
+                pass
+        if os.path.isdir(CACHE_DIR):
+            _gravar_sincronizacao(sincronizacao)
+
+
+# Versão da cópia local (muda a cada gravação); None quando não há cópia
+def versao(worksheet):
+    try:
+        return os.stat(_caminho(f'{worksheet}.parquet')).st_mtime_ns
+    except OSError:
+        return None
+
+
+# Metadados livres guardados junto da cópia local (ex.: versão de origem dos agregados)
+def ler_metadado(chave):
+    return _ler_json(_ARQUIVO_METADADOS).get(chave)
+
+
+def gravar_metadado(chave, valor):
+    with _trava:
+        metadados = _ler_json(_ARQUIVO_METADADOS)
+        metadados[chave] = valor
+        _gravar_json(_ARQUIVO_METADADOS, metadados)
@@ -0,0 +1,89 @@
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Banco DuckDB em memória compartilhado pelo processo; cada relatório usa um
+# cursor próprio (as sessões do Streamlit rodam em threads diferentes)
+_banco = duckdb.connect()
+
+
+# Agregado como tabela Arrow: colunas numéricas e datas sem cópia; o veículo vai
+# pelo código da categoria (inteiro), para que agrupar e ordenar não compare textos
+def _tabela(agregado):
+    codigos = agregado['Veículo'].cat.codes.to_numpy()
+    colunas = {coluna: pa.array(agregado[coluna].to_numpy()) for coluna in agregado.columns
+               if coluna != 'Veículo'}
+    colunas['Veiculo'] = pa.array(codigos, mask=codigos < 0)
+    return pa.table(colunas)
+
+
+def _categorias(codigos, agregado):
+    return pd.Categorical.from_codes(np.asarray(codigos, dtype='int64'),
+                                     categories=agregado['Veículo'].cat.categories)
+
+
+def _filtro(inicio, condicoes=()):
+    condicoes = list(condicoes)
+    parametros = []
+    if inicio is not None:
+        condicoes.append('Periodo >= ?')
+        parametros.append(inicio)
+    return ('WHERE ' + ' AND '.join(condicoes) if condicoes else ''), parametros
+
+
+# Total geral e total por veículo numa única passada (GROUPING SETS); a linha
+# do total inclui registros sem veículo, como a soma da planilha inteira
+def _totais(cursor, tabela, agregado, colunas, inicio):
+    where, parametros = _filtro(inicio)
+    somas = ', '.join(f'coalesce(sum("{coluna}"), 0) AS "{coluna}"' for coluna in colunas)
+    resultado = cursor.execute(
+        f'SELECT grouping(Veiculo) AS geral, Veiculo, {somas}, count(*) AS linhas '
+        f'FROM {tabela} {where} GROUP BY GROUPING SETS ((), (Veiculo)) '
+        f'HAVING grouping(Veiculo) = 1 OR Veiculo IS NOT NULL ORDER BY Veiculo',
+        parametros).df()
+    geral = resultado[resultado['geral'] == 1].iloc[0]
+    por_veiculo = resultado[resultado['geral'] == 0]
+    por_veiculo = pd.DataFrame({'Veículo': _categorias(por_veiculo['Veiculo'], agregado),
+                                **{coluna: por_veiculo[coluna].to_numpy() for coluna in colunas}})
+    return geral, por_veiculo
+
+
+# Série por período e veículo. Os agregados já vêm ordenados por período e
+# veículo, e o DuckDB preserva a ordem de entrada em consultas sem ORDER BY
+def _serie(cursor, tabela, agregado, nome_periodo, coluna, inicio, periodo='Periodo'):
+    where, parametros = _filtro(inicio, ['Periodo IS NOT NULL', 'Veiculo IS NOT NULL'])
+    serie = cursor.execute(f'SELECT {periodo} AS Periodo, Veiculo, "{coluna}" FROM {tabela} {where}',
+                           parametros).fetchnumpy()
+    return pd.DataFrame({nome_periodo: serie['Periodo'],
+                         'Veículo': _categorias(serie['Veiculo'], agregado),
+                         coluna: serie[coluna]})
+
+
+# Métricas, totais por veículo e séries dos relatórios a partir dos agregados
+# (período × veículo), recortados a partir de `inicio`, em poucas consultas
+# DuckDB sobre tabelas Arrow
+def resumir(abast_agregado, manut_agregado, inicio):
+    cursor = _banco.cursor()
+    try:
+        cursor.register('abastecimentos', _tabela(abast_agregado))
+        cursor.register('manutencoes', _tabela(manut_agregado))
+
+        abast, litros_por_veiculo = _totais(cursor, 'abastecimentos', abast_agregado,
+                                            ['Litros', 'Valor'], inicio)
+        manut, manut_por_veiculo = _totais(cursor, 'manutencoes', manut_agregado, ['Valor'], inicio)
+        manut_mensal = _serie(cursor, 'manutencoes', manut_agregado, 'Mês', 'Valor', inicio,
+                              periodo="strftime(Periodo, '%Y-%m')")
+        return {
+            'abast_vazio': abast['linhas'] == 0,
+            'manut_vazio': manut['linhas'] == 0,
+            'total_litros': abast['Litros'],
+            'total_gasto_comb': abast['Valor'],
+            'total_gasto_manut': manut['Valor'],
+            'litros_por_veiculo': litros_por_veiculo[['Veículo', 'Litros']],
+            'abast_diario': _serie(cursor, 'abastecimentos', abast_agregado, 'Dia', 'Litros', inicio),
+            'manut_por_veiculo': manut_por_veiculo,
+            'manut_mensal': manut_mensal,
+        }
+    finally:
+        cursor.close()
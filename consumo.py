@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+import cache_local
+import diagnostico
+
+
+# Calcula o consumo (km/L) de cada abastecimento e a média de cada veículo
+# em uma única passada sobre toda a frota
+@diagnostico.cronometrar('calcular_consumo')
+def calcular_consumo(df):
+    # Fazemos uma cópia para preservar o dataframe original
+    # (Km_Atual, Litros e Data já chegam tipados pelo esquema de load_data)
+    result_df = df.copy()
+
+    # Ordenar por data (estável, para empates manterem a ordem de registro)
+    # e agrupar por veículo: diff/shift passam a operar dentro de cada veículo
+    ordenado = result_df.sort_values('Data', kind='stable')
+    grupos = ordenado.groupby('Veículo', sort=False, observed=True)
+
+    # Km rodados desde o abastecimento anterior divididos pelos litros daquele abastecimento
+    km_diff = grupos['Km_Atual'].diff()
+    litros_ant = grupos['Litros'].shift(1)
+    result_df['Consumo_km_l'] = km_diff / litros_ant
+
+    # Remover as linhas onde não foi possível calcular o consumo
+    consumo_df = result_df.dropna(subset=['Consumo_km_l'])
+
+    # Média por veículo; veículos sem intervalo calculável ficam com 0
+    consumo_medio = (consumo_df.groupby('Veículo', observed=True)['Consumo_km_l'].mean()
+                     .reindex(result_df['Veículo'].dropna().unique(), fill_value=0.0))
+
+    return consumo_df, consumo_medio
+
+
+# Estado de consumo de toda a frota, mantido junto da cópia local: por veículo,
+# o último abastecimento (data, km e litros), o número de intervalos calculados
+# e a soma dos km/L; mais a série de consumo por abastecimento já calculada.
+# Um abastecimento novo só altera o último intervalo do seu veículo, então é
+# incorporado em O(1); lançamentos retroativos forçam o recálculo
+_ESTADO = 'consumo_estado'
+_SERIE = 'consumo_abastecimentos'
+
+
+def _construir_estado(ordenado, consumo_df):
+    veiculos = ordenado.dropna(subset=['Veículo'])
+    grupos = veiculos.groupby('Veículo', sort=False, observed=True)
+    estado = grupos.agg(Primeira=('Data', 'first'))
+    ultimos = grupos.tail(1).set_index('Veículo')
+    estado['Data'] = ultimos['Data']
+    estado['Km'] = ultimos['Km_Atual']
+    estado['Litros'] = ultimos['Litros']
+    intervalos = consumo_df.groupby('Veículo', observed=True)['Consumo_km_l'].agg(['count', 'sum'])
+    estado['Intervalos'] = intervalos['count'].reindex(estado.index, fill_value=0).astype('int64')
+    estado['Soma'] = intervalos['sum'].reindex(estado.index, fill_value=0.0).astype('float64')
+    estado.index = estado.index.astype(str)
+    return estado.rename_axis('Veículo').reset_index()
+
+
+def _medias(estado):
+    medias = estado['Soma'] / estado['Intervalos'].where(estado['Intervalos'] > 0)
+    return pd.Series(medias.fillna(0.0).to_numpy(), index=pd.Index(estado['Veículo'], name='Veículo'),
+                     name='Consumo_km_l')
+
+
+# Aplica um abastecimento ao estado do veículo; retorna o consumo do novo
+# intervalo (NaN se não calculável) ou False se a linha não vem depois do
+# último abastecimento do veículo na ordenação por data
+def _atualizar(estado, linha):
+    veiculo = linha['Veículo']
+    if pd.isna(veiculo):
+        return np.nan
+    if pd.isna(linha['Data']):
+        # Datas inválidas vão para o fim da ordenação, junto das demais
+        return False
+    anterior = estado.get(str(veiculo))
+    if anterior is None:
+        estado[str(veiculo)] = {'Primeira': linha['Data'], 'Data': linha['Data'], 'Km': linha['Km_Atual'],
+                                'Litros': linha['Litros'], 'Intervalos': 0, 'Soma': 0.0}
+        return np.nan
+    if pd.isna(anterior['Data']) or linha['Data'] < anterior['Data']:
+        return False
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        consumo = ((np.float32(linha['Km_Atual']) - np.float32(anterior['Km']))
+                   / np.float32(anterior['Litros']))
+    if not np.isnan(consumo):
+        anterior['Intervalos'] += 1
+        anterior['Soma'] += float(consumo)
+    anterior.update(Data=linha['Data'], Km=linha['Km_Atual'], Litros=linha['Litros'])
+    return consumo
+
+
+# Consumo por abastecimento e média por veículo de todo o período, para a
+# versão `versao` da planilha; só recalcula tudo quando a versão não bate
+@diagnostico.cronometrar('consumo.carregar', cache=True)
+def carregar(versao, carregar_planilha):
+    if versao is not None and cache_local.ler_metadado(_ESTADO) == versao:
+        estado = cache_local.ler(_ESTADO)
+        consumo_df = cache_local.ler(_SERIE)
+        if estado is not None and consumo_df is not None:
+            return consumo_df, _medias(estado)
+
+    diagnostico.anotar(cache=False)
+    ordenado = carregar_planilha('Abastecimentos').sort_values(
+        'Data', kind='stable', na_position='last', ignore_index=True)
+    consumo_df, _ = calcular_consumo(ordenado)
+    consumo_df = consumo_df.reset_index(drop=True)
+    estado = _construir_estado(ordenado, consumo_df)
+    cache_local.gravar(_ESTADO, estado, sincronizado=False)
+    cache_local.gravar(_SERIE, consumo_df, sincronizado=False)
+    cache_local.gravar_metadado(_ESTADO, versao)
+    return consumo_df, _medias(estado)
+
+
+# Incorpora abastecimentos recém-gravados ao estado, sem reler a planilha
+@diagnostico.cronometrar('consumo.acrescentar')
+def acrescentar(novas_linhas, versao_anterior, versao_nova):
+    estado_df = None
+    if versao_anterior is not None and cache_local.ler_metadado(_ESTADO) == versao_anterior:
+        estado_df = cache_local.ler(_ESTADO)
+    if estado_df is None:
+        invalidar()
+        return
+
+    estado = {registro.pop('Veículo'): registro for registro in estado_df.to_dict('records')}
+    consumos = []
+    for linha in novas_linhas.to_dict('records'):
+        consumo = _atualizar(estado, linha)
+        if consumo is False:
+            # Abastecimento retroativo: muda intervalos já calculados; recalcula na próxima leitura
+            diagnostico.anotar(recalculo=True)
+            invalidar()
+            return
+        consumos.append(consumo)
+
+    estado_df = pd.DataFrame([{'Veículo': veiculo, **registro} for veiculo, registro in estado.items()],
+                             columns=estado_df.columns).astype(estado_df.dtypes.to_dict())
+    cache_local.gravar(_ESTADO, estado_df, sincronizado=False)
+
+    novos = novas_linhas.assign(Consumo_km_l=np.asarray(consumos, dtype='float32'))
+    novos = novos.dropna(subset=['Consumo_km_l'])
+    if not novos.empty:
+        consumo_df = cache_local.ler(_SERIE)
+        if consumo_df is None:
+            invalidar()
+            return
+        consumo_df = pd.concat([consumo_df, novos], ignore_index=True)
+        consumo_df['Veículo'] = consumo_df['Veículo'].astype('category')
+        # Mantém a série ordenada por data (os cortes de período usam busca binária)
+        if not consumo_df['Data'].is_monotonic_increasing:
+            consumo_df = consumo_df.sort_values('Data', kind='stable', na_position='last', ignore_index=True)
+        cache_local.gravar(_SERIE, consumo_df, sincronizado=False)
+    cache_local.gravar_metadado(_ESTADO, versao_nova)
+
+
+# Descarta o estado; será reconstruído na próxima leitura
+def invalidar():
+    cache_local.gravar_metadado(_ESTADO, None)
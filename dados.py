@@ -0,0 +1,374 @@
+import contextlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import agregados
+import armazenamento
+import cache_local
+import consumo
+import diagnostico
+import esquema
+import relatorio
+from fila_escrita import FilaEscrita
+
+
+# Conexão com o Google Sheets (st.connection já a reaproveita entre execuções).
+# gspread e as bibliotecas do Google só são importados na primeira conexão; as
+# execuções servidas pela cópia local ou pelo banco não pagam esse custo
+def _conexao():
+    from streamlit_gsheets import GSheetsConnection
+    return st.connection("gsheets", type=GSheetsConnection)
+
+# Funções para manipulação de dados
+@diagnostico.cronometrar('load_data')
+def load_data(worksheet):
+    diagnostico.anotar(worksheet=worksheet, cache=True)
+    try:
+        banco = armazenamento.banco()
+        if banco is not None:
+            diagnostico.anotar(cache=False, armazenamento='sqlite')
+            return banco.ler(worksheet)
+
+        # Servir a partir da cópia local enquanto ela estiver atualizada; com envios
+        # ainda na fila, a cópia local é a única que já contém esses registros
+        if not cache_local.precisa_atualizar(worksheet) or escritas_pendentes(worksheet):
+            data = cache_local.ler(worksheet)
+            if data is not None:
+                return data
+
+        diagnostico.anotar(cache=False)
+        if worksheet in PLANILHAS_INCREMENTAIS:
+            return _sincronizar(worksheet)
+
+        data = _ler_planilha(worksheet)
+        cache_local.gravar(worksheet, data)
+        return data
+    except Exception:
+        return esquema.normalizar(pd.DataFrame(), worksheet)
+
+# Leitura completa de uma planilha do Google Sheets
+def _ler_planilha(worksheet, ttl=5, compacto=True):
+    data = _conexao().read(worksheet=worksheet, ttl=ttl)
+
+    # Ensure 'Km_Atual' exists for 'Veiculos' worksheet
+    if worksheet == 'Veiculos' and not data.empty and 'Km_Atual' not in data.columns:
+        data['Km_Atual'] = data['Km_Inicial']
+
+    # Aplicar o esquema da planilha (tipos compactos e nomes de coluna padronizados)
+    return esquema.normalizar(data, worksheet, compacto)
+
+# Carrega várias planilhas ao mesmo tempo (uma leitura de rede por thread) e
+# retorna {planilha: DataFrame já normalizado}
+def load_data_many(worksheets):
+    worksheets = list(dict.fromkeys(worksheets))
+    if len(worksheets) <= 1:
+        return {worksheet: load_data(worksheet) for worksheet in worksheets}
+    # As threads herdam o contexto da execução atual (st.connection e caches do Streamlit)
+    contexto = get_script_run_ctx()
+
+    def iniciar_thread():
+        if contexto is not None:
+            add_script_run_ctx(ctx=contexto)
+
+    carregar = diagnostico.propagar(load_data)
+    with diagnostico.medir('load_data_many', planilhas=len(worksheets)):
+        with ThreadPoolExecutor(max_workers=len(worksheets), thread_name_prefix='leitura-planilha',
+                                initializer=iniciar_thread) as pool:
+            return dict(zip(worksheets, pool.map(carregar, worksheets)))
+
+# Reescreve a planilha inteira. Os formulários e a fila só acrescentam linhas
+# (append_data / enqueue_append) e alteram células (update_km_cells)
+@diagnostico.cronometrar('save_data')
+def save_data(data, worksheet):
+    diagnostico.anotar(worksheet=worksheet, linhas=len(data))
+    banco = armazenamento.banco()
+    if banco is not None:
+        banco.substituir(worksheet, data)
+        relatorio.limpar_cache()
+        return
+    _conexao().update(worksheet=worksheet, data=esquema.desnormalizar(data, worksheet))
+    cache_local.gravar(worksheet, data)
+    relatorio.limpar_cache()
+
+# Versão dos dados de uma planilha, usada como chave dos cálculos memorizados
+def data_version(worksheet):
+    banco = armazenamento.banco()
+    if banco is not None:
+        return banco.versao(worksheet)
+    if cache_local.precisa_atualizar(worksheet):
+        load_data(worksheet)
+    versao = cache_local.versao(worksheet)
+    if versao is None:
+        # Sem cópia local: usa o conteúdo da planilha como versão
+        versao = int(pd.util.hash_pandas_object(load_data(worksheet)).sum())
+    return versao
+
+# Versões de várias planilhas; as que precisam ser relidas são buscadas em paralelo
+def data_versions(worksheets):
+    if armazenamento.banco() is not None:
+        return [data_version(worksheet) for worksheet in worksheets]
+    load_data_many([worksheet for worksheet in worksheets if cache_local.precisa_atualizar(worksheet)])
+    return [data_version(worksheet) for worksheet in worksheets]
+
+# Cabeçalhos das planilhas já consultados (evita ler a primeira linha a cada envio)
+_cabecalhos = {}
+
+def _valor_planilha(valor):
+    # Converte valores do pandas/numpy para tipos simples aceitos pela API do Sheets
+    if pd.isna(valor):
+        return ""
+    if isinstance(valor, (pd.Timestamp, datetime)):
+        return valor.strftime('%Y-%m-%d')
+    if hasattr(valor, 'item'):
+        return valor.item()
+    return valor
+
+def _linhas_planilha(data, cabecalho):
+    # Ordena as colunas conforme o cabeçalho da planilha
+    data = data.reindex(columns=cabecalho)
+    return [[_valor_planilha(valor) for valor in linha] for linha in data.itertuples(index=False)]
+
+def _planilha(worksheet):
+    planilha = _conexao().client._select_worksheet(worksheet=worksheet)
+    if worksheet not in _cabecalhos:
+        _cabecalhos[worksheet] = planilha.row_values(1)
+    return planilha, _cabecalhos[worksheet]
+
+def _enviar_linhas(data, worksheet):
+    # Acrescenta apenas as novas linhas ao final da planilha, sem reenviar o histórico
+    linhas = esquema.desnormalizar(data, worksheet)
+    planilha, cabecalho = _planilha(worksheet)
+    if not cabecalho:
+        cabecalho = _cabecalhos[worksheet] = list(linhas.columns)
+        planilha.append_row(cabecalho)
+    planilha.append_rows(_linhas_planilha(linhas, cabecalho), value_input_option='USER_ENTERED')
+
+def _registrar_local(data, worksheet):
+    # Atualizar a cópia local e os agregados dos relatórios só com as novas linhas
+    novas_linhas = esquema.normalizar(data, worksheet)
+    with _travas_planilha.get(worksheet, contextlib.nullcontext()):
+        versao_anterior = cache_local.versao(worksheet)
+        cache_local.acrescentar(worksheet, novas_linhas)
+        _acrescentar_derivados(worksheet, novas_linhas, versao_anterior, cache_local.versao(worksheet))
+    relatorio.limpar_cache()
+
+# Agregados e estado de consumo derivados da planilha, atualizados só com as novas linhas
+def _acrescentar_derivados(worksheet, novas_linhas, versao_anterior, versao_nova):
+    if worksheet in agregados.AGREGADOS:
+        agregados.acrescentar(worksheet, novas_linhas, versao_anterior, versao_nova)
+    if worksheet == 'Abastecimentos':
+        consumo.acrescentar(novas_linhas, versao_anterior, versao_nova)
+
+def _invalidar_derivados(worksheet):
+    if worksheet in agregados.AGREGADOS:
+        agregados.invalidar(worksheet)
+    if worksheet == 'Abastecimentos':
+        consumo.invalidar()
+
+# Planilhas em que o app só acrescenta linhas: atualizadas por delta, buscando
+# apenas as linhas depois da marca d'água da última sincronização
+PLANILHAS_INCREMENTAIS = ('Abastecimentos', 'Manutencoes')
+
+# Intervalo máximo (s) entre releituras completas dessas planilhas, para captar
+# valores editados no meio da planilha, que a marca d'água não detecta
+RELEITURA_COMPLETA = int(os.environ.get('GERENCIADOR_RELEITURA_COMPLETA', 3600))
+
+def _ler_linhas(planilha, primeira_linha, ultima_linha=None):
+    # Linhas a partir de `primeira_linha` (1 = cabeçalho) até `ultima_linha` ou o
+    # fim da planilha, renderizadas como em conn.read
+    from gspread.utils import rowcol_to_a1
+    coluna_final = re.sub(r'\d', '', rowcol_to_a1(1, planilha.col_count))
+    return planilha.get(f'A{primeira_linha}:{coluna_final}{ultima_linha or ""}',
+                        value_render_option='UNFORMATTED_VALUE', date_time_render_option='FORMATTED_STRING')
+
+def _frame_linhas(linhas, cabecalho, worksheet, compacto=True):
+    # O Sheets omite células vazias no fim de cada linha; o DataFrame completa com None
+    data = pd.DataFrame(linhas, dtype=object).reindex(columns=range(len(cabecalho)))
+    data.columns = cabecalho
+    data = data.mask(data == '')  # células vazias no meio da linha chegam como ''
+    return esquema.normalizar(data, worksheet, compacto)
+
+# Marca d'água: linhas da planilha já sincronizadas (contando linhas em branco),
+# conteúdo da última delas, linhas da cópia local que vieram da planilha e
+# horário da última releitura completa
+def _gravar_marca(worksheet, linhas, ultima, cabecalho, locais, completa):
+    cache_local.gravar_metadado(f'marca_{worksheet}', {
+        'linhas': linhas, 'ultima': list(ultima), 'cabecalho': cabecalho,
+        'locais': locais, 'completa': completa,
+    })
+
+# Uma trava por planilha incremental: sincronização e registro local leem a cópia
+# local, a marca d'água e a versão dos agregados e gravam os três; duas sessões
+# fazendo isso ao mesmo tempo aplicariam o mesmo delta duas vezes aos agregados
+_travas_planilha = {worksheet: threading.RLock() for worksheet in PLANILHAS_INCREMENTAIS}
+
+def _sincronizar(worksheet):
+    with _travas_planilha[worksheet]:
+        planilha = _conexao().client._select_worksheet(worksheet=worksheet)
+        marca = cache_local.ler_metadado(f'marca_{worksheet}')
+        atual = cache_local.ler(worksheet)
+        if (marca and atual is not None and marca['locais'] <= len(atual)
+                and time.time() - marca['completa'] < RELEITURA_COMPLETA):
+            # Relê a última linha sincronizada junto com as posteriores: se ela mudou,
+            # linhas foram inseridas, removidas ou editadas antes da marca
+            linhas = _ler_linhas(planilha, marca['linhas'] + 1)
+            if linhas and list(linhas[0]) == marca['ultima']:
+                return _aplicar_delta(worksheet, atual, marca, linhas[1:])
+
+        diagnostico.anotar(sincronizacao='completa')
+        linhas = _ler_linhas(planilha, 1)
+        cabecalho = list(linhas[0]) if linhas else []
+        _cabecalhos[worksheet] = cabecalho
+        data = _frame_linhas(linhas[1:], cabecalho, worksheet)
+        cache_local.gravar(worksheet, data)
+        _gravar_marca(worksheet, max(len(linhas) - 1, 0), linhas[-1] if linhas else [], cabecalho,
+                      len(data), time.time())
+        return data
+
+def _aplicar_delta(worksheet, atual, marca, linhas):
+    diagnostico.anotar(sincronizacao='delta', linhas_novas=len(linhas))
+    # Linhas acrescentadas localmente pelo app desde a sincronização; sem envios
+    # pendentes, todas já estão na planilha e voltam no delta
+    proprias = atual.iloc[marca['locais']:]
+    if not linhas and proprias.empty:
+        cache_local.marcar_sincronizado(worksheet)
+        return atual
+
+    novas = _frame_linhas(linhas, marca['cabecalho'], worksheet)
+    versao_anterior = cache_local.versao(worksheet)
+    cache_local.acrescentar(worksheet, novas, manter=marca['locais'], sincronizado=True)
+    data = cache_local.ler(worksheet)
+    if data is None:
+        return _sincronizar(worksheet)
+    _gravar_marca(worksheet, marca['linhas'] + len(linhas), linhas[-1] if linhas else marca['ultima'],
+                  marca['cabecalho'], len(data), marca['completa'])
+
+    # Agregados e consumo: só as linhas que ainda não estavam na cópia local entram no incremento
+    if _mesmas_linhas(proprias, novas.iloc[:len(proprias)], worksheet):
+        _acrescentar_derivados(worksheet, novas.iloc[len(proprias):], versao_anterior,
+                               cache_local.versao(worksheet))
+    else:
+        _invalidar_derivados(worksheet)
+    return data
+
+def _mesmas_linhas(locais, planilha, worksheet):
+    if len(locais) != len(planilha):
+        return False
+    colunas = list(esquema.ESQUEMAS[worksheet])
+    locais = esquema.desnormalizar(locais[colunas], worksheet).astype(str).to_numpy()
+    planilha = esquema.desnormalizar(planilha[colunas], worksheet).astype(str).to_numpy()
+    return bool((locais == planilha).all())
+
+# Com o banco local, a gravação é uma transação síncrona, sem cópia local nem fila.
+# O banco recebe os números originais (float64); agregados e consumo, a versão compacta
+def _gravar_no_banco(banco, data, worksheet):
+    novas_linhas = esquema.normalizar(data, worksheet)
+    # Como em _registrar_local: gravação e agregados na mesma ordem em todas as sessões
+    with _travas_planilha.get(worksheet, contextlib.nullcontext()):
+        versao_anterior, versao_nova = banco.acrescentar(worksheet,
+                                                         esquema.normalizar(data, worksheet, compacto=False))
+        _acrescentar_derivados(worksheet, novas_linhas, versao_anterior, versao_nova)
+    relatorio.limpar_cache()
+
+@diagnostico.cronometrar('append_data')
+def append_data(data, worksheet):
+    diagnostico.anotar(worksheet=worksheet, linhas=len(data))
+    if data.empty:
+        return
+    banco = armazenamento.banco()
+    if banco is not None:
+        _gravar_no_banco(banco, data, worksheet)
+        return
+    _enviar_linhas(data, worksheet)
+    _registrar_local(data, worksheet)
+
+def append_data_batch(lotes):
+    # Envia vários registros pendentes com uma única chamada por planilha
+    # (chamada pela fila de gravação, na thread dela: as medições vão só para o log)
+    por_planilha = {}
+    for worksheet, data in lotes:
+        por_planilha.setdefault(worksheet, []).append(data)
+    for worksheet, frames in por_planilha.items():
+        data = pd.concat(frames, ignore_index=True)
+        with diagnostico.medir('fila.enviar_linhas', worksheet=worksheet, linhas=len(data)):
+            _enviar_linhas(data, worksheet)
+
+# Planilhas antigas de veículos não têm a coluna Km_Atual (load_data usa o
+# Km_Inicial no lugar); cria a coluna ao fim, preenchida com o Km_Inicial
+def _criar_coluna_km(planilha, cabecalho, linhas):
+    from gspread.utils import rowcol_to_a1
+    coluna = len(cabecalho) + 1
+    if coluna > planilha.col_count:
+        planilha.add_cols(coluna - planilha.col_count)
+    km_inicial = planilha.col_values(cabecalho.index('Km_Inicial') + 1,
+                                     value_render_option='UNFORMATTED_VALUE')[1:]
+    km_inicial += [''] * (linhas - len(km_inicial))
+    planilha.batch_update([{
+        'range': f'{rowcol_to_a1(1, coluna)}:{rowcol_to_a1(linhas + 1, coluna)}',
+        'values': [['Km_Atual']] + [[km] for km in km_inicial],
+    }], value_input_option='USER_ENTERED')
+    cabecalho.append('Km_Atual')  # _cabecalhos guarda a mesma lista
+
+# Grava o Km_Atual de vários veículos alterando só as células correspondentes
+@diagnostico.cronometrar('update_km_cells')
+def update_km_cells(atualizacoes):
+    diagnostico.anotar(veiculos=len(atualizacoes))
+    from gspread.utils import rowcol_to_a1
+    planilha, cabecalho = _planilha('Veiculos')
+    coluna_nome = cabecalho.index('Nome') + 1
+    nomes = planilha.col_values(coluna_nome)[1:]
+    if 'Km_Atual' not in cabecalho:
+        _criar_coluna_km(planilha, cabecalho, len(nomes))
+    coluna_km = cabecalho.index('Km_Atual') + 1
+    celulas = []
+    for nome, km in atualizacoes.items():
+        if nome in nomes:
+            linha = nomes.index(nome) + 2  # cabeçalho ocupa a linha 1
+            celulas.append({'range': rowcol_to_a1(linha, coluna_km), 'values': [[km]]})
+    if celulas:
+        planilha.batch_update(celulas, value_input_option='USER_ENTERED')
+
+# Fila de gravação em segundo plano, compartilhada por todas as sessões do processo
+@st.cache_resource
+def _fila():
+    return FilaEscrita(
+        enviar_linhas=append_data_batch,
+        enviar_km=update_km_cells,
+        arquivo=os.path.join(cache_local.CACHE_DIR, 'fila_escrita.jsonl'),
+    )
+
+def escritas_pendentes(worksheet=None):
+    if armazenamento.banco() is not None:
+        return 0
+    return _fila().pendentes(worksheet)
+
+# Registra as linhas localmente na hora e deixa o envio ao Google Sheets para a fila
+@diagnostico.cronometrar('enqueue_append')
+def enqueue_append(data, worksheet):
+    diagnostico.anotar(worksheet=worksheet, linhas=len(data))
+    if data.empty:
+        return
+    banco = armazenamento.banco()
+    if banco is not None:
+        _gravar_no_banco(banco, data, worksheet)
+        return
+    linhas = esquema.desnormalizar(data, worksheet)
+    _fila().enfileirar_linhas(worksheet, list(linhas.columns), _linhas_planilha(linhas, list(linhas.columns)))
+    _registrar_local(data, worksheet)
+
+@diagnostico.cronometrar('enqueue_km_update')
+def enqueue_km_update(nome, km, veiculos_df):
+    banco = armazenamento.banco()
+    if banco is not None:
+        banco.atualizar_km({nome: km})
+        return
+    _fila().enfileirar_km(nome, km)
+    cache_local.gravar('Veiculos', veiculos_df, sincronizado=False)
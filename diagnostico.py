@@ -0,0 +1,134 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Cada execução do script roda em uma thread própria do Streamlit; as medições
+# ficam presas à thread, sem depender de st.session_state nos caminhos de dados
+_local = threading.local()
+
+# Arquivo opcional onde cada medição é acrescentada como uma linha JSON
+ARQUIVO = os.environ.get('GERENCIADOR_DIAGNOSTICO_ARQUIVO')
+
+
+# Começa uma nova execução: descarta as medições da execução anterior
+def iniciar_execucao():
+    _local.registros = []
+    _local.abertos = []
+    _local.inicio = time.perf_counter()
+
+
+def registros():
+    return list(getattr(_local, 'registros', []))
+
+
+# Envolve `funcao` para rodar em outra thread (ex.: pool de leituras) registrando
+# as medições na execução da thread que a criou. As medições abertas nessa thread
+# no momento da chamada (ex.: load_data_many) contam para o nível das de dentro
+def propagar(funcao):
+    registros_execucao = getattr(_local, 'registros', None)
+    abertos_execucao = getattr(_local, 'abertos', None)
+    if abertos_execucao is None:
+        abertos_execucao = _local.abertos = []
+
+    @functools.wraps(funcao)
+    def na_thread(*args, **kwargs):
+        _local.registros = registros_execucao
+        _local.abertos = list(abertos_execucao)
+        return funcao(*args, **kwargs)
+    return na_thread
+
+
+# Mede o bloco e registra etapa, duração, linhas e acerto de cache. O registro
+# devolvido pode ser completado dentro do bloco (ex.: registro['linhas'] = n)
+@contextmanager
+def medir(etapa, **detalhes):
+    abertos = getattr(_local, 'abertos', None)
+    if abertos is None:
+        abertos = _local.abertos = []
+    # nivel > 0: medição feita dentro de outra (o tempo já está contado na de fora)
+    registro = {'etapa': etapa, 'nivel': len(abertos), **detalhes}
+    abertos.append(registro)
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro['segundos'] = time.perf_counter() - inicio
+        abertos.pop()
+        _registrar(registro)
+
+
+# Completa a medição em andamento mais interna (ex.: anotar(cache=False))
+def anotar(**detalhes):
+    abertos = getattr(_local, 'abertos', None)
+    if abertos:
+        abertos[-1].update(detalhes)
+
+
+# Decorador de `medir`. Com cache=True, a medição começa como acerto e a função
+# memorizada chama anotar(cache=False) quando de fato executa; por isso deve
+# ficar por fora de @st.cache_data
+def cronometrar(etapa, cache=False):
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            with medir(etapa, **({'cache': True} if cache else {})) as registro:
+                resultado = funcao(*args, **kwargs)
+                registro.setdefault('linhas', _contar_linhas(resultado))
+                return resultado
+        if hasattr(funcao, 'clear'):
+            medida.clear = funcao.clear
+        return medida
+    return decorador
+
+
+def _contar_linhas(resultado):
+    if isinstance(resultado, tuple) and resultado:
+        resultado = resultado[0]
+    if isinstance(resultado, pd.DataFrame):
+        return len(resultado)
+    return None
+
+
+def _registrar(registro):
+    registros_execucao = getattr(_local, 'registros', None)
+    if registros_execucao is not None:
+        registros_execucao.append(registro)
+    if ARQUIVO or logger.isEnabledFor(logging.INFO):
+        linha = json.dumps({'momento': time.time(), 'thread': threading.current_thread().name,
+                            **registro}, ensure_ascii=False, default=str)
+        logger.info(linha)
+        if ARQUIVO:
+            try:
+                with open(ARQUIVO, 'a', encoding='utf-8') as arquivo:
+                    arquivo.write(linha + '\n')
+            except OSError:
+                logger.warning("Não foi possível gravar o diagnóstico em %s", ARQUIVO)
+
+
+# Medições da execução atual em tabela, na ordem em que terminaram
+def tabela():
+    colunas = ['etapa', 'segundos', 'linhas', 'cache']
+    df = pd.DataFrame(registros())
+    for coluna in colunas:
+        if coluna not in df.columns:
+            df[coluna] = None
+    return df[colunas + [coluna for coluna in df.columns if coluna not in colunas]]
+
+
+# Medições da execução atual em JSON Lines, para download pelo painel
+def exportar():
+    return '\n'.join(json.dumps(registro, ensure_ascii=False, default=str)
+                     for registro in registros())
+
+
+def tempo_execucao():
+    inicio = getattr(_local, 'inicio', None)
+    return None if inicio is None else time.perf_counter() - inicio
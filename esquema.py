@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# Tipos de cada coluna por planilha: 'categoria', 'numero' (float32), 'data' ou 'texto'.
+# float32 é só a representação em memória do app; o que é gravado no banco ou na
+# planilha parte dos valores originais (normalizar(..., compacto=False))
+ESQUEMAS = {
+    'Veiculos': {
+        'Nome': 'texto',
+        'Marca': 'texto',
+        'Km_Inicial': 'numero',
+        'Km_Atual': 'numero',
+        'Data_Registro': 'data',
+    },
+    'Abastecimentos': {
+        'Veículo': 'categoria',
+        'Data': 'data',
+        'Preço': 'numero',
+        'Litros': 'numero',
+        'Valor': 'numero',
+        'Km_Atual': 'numero',
+    },
+    'Manutencoes': {
+        'Veículo': 'categoria',
+        'Data': 'data',
+        'Valor': 'numero',
+        'Descricao': 'texto',
+        'Km_Atual': 'numero',
+    },
+}
+
+# Colunas cujo nome na planilha difere do nome usado no app
+COLUNAS_PLANILHA = {
+    'Manutencoes': {'Veículo': 'Veiculo'},
+}
+
+
+def _converter(serie, tipo, compacto=True):
+    if tipo == 'numero':
+        numeros = pd.to_numeric(serie, errors='coerce')
+        if compacto:
+            return numeros.astype('float32')
+        # Valores que já passaram pelo app (float32) voltam ao número digitado
+        return _float64(numeros) if numeros.dtype == 'float32' else numeros.astype('float64')
+    if tipo == 'data':
+        return pd.to_datetime(serie, errors='coerce')
+    if tipo == 'categoria':
+        return serie.where(serie.isna(), serie.astype(str)).astype('category')
+    return serie.where(serie.isna(), serie.astype(str)).astype(object)
+
+
+# Converte um DataFrame lido da planilha para os tipos do esquema; com
+# compacto=False os números ficam em float64, sem perder precisão
+def normalizar(df, worksheet, compacto=True):
+    esquema = ESQUEMAS.get(worksheet)
+    if esquema is None:
+        return df
+
+    renomear = {planilha: coluna for coluna, planilha in COLUNAS_PLANILHA.get(worksheet, {}).items()}
+    df = df.rename(columns=renomear)
+
+    # Linhas totalmente vazias aparecem quando a planilha tem células formatadas
+    df = df.dropna(how='all').reset_index(drop=True)
+
+    for coluna, tipo in esquema.items():
+        if coluna not in df.columns:
+            df[coluna] = pd.Series(index=df.index, dtype=object)
+        df[coluna] = _converter(df[coluna], tipo, compacto)
+    return df
+
+
+# float32 guarda ~7 algarismos significativos; arredondar a eles devolve o valor
+# digitado (5.38 em vez de 5.380000114440918) ao gravar na planilha ou no banco
+def _float64(serie):
+    valores = serie.astype('float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        escala = 10.0 ** (6 - np.floor(np.log10(np.abs(valores))))
+        arredondado = np.round(valores * escala) / escala
+    return arredondado.where(np.isfinite(escala) & (escala > 0), valores)
+
+
+# Converte de volta para o formato gravado na planilha (nomes de coluna e datas em texto)
+def desnormalizar(df, worksheet):
+    esquema = ESQUEMAS.get(worksheet, {})
+    df = df.copy()
+    for coluna, tipo in esquema.items():
+        if coluna not in df.columns:
+            continue
+        if tipo == 'data':
+            df[coluna] = pd.to_datetime(df[coluna], errors='coerce').dt.strftime('%Y-%m-%d')
+        elif tipo == 'categoria':
+            df[coluna] = df[coluna].astype(object)
+        elif tipo == 'numero' and df[coluna].dtype == 'float32':
+            df[coluna] = _float64(df[coluna])
+    return df.rename(columns=COLUNAS_PLANILHA.get(worksheet, {}))
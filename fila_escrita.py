@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+import pandas as pd
+from tenacity import Retrying, stop_after_attempt, wait_exponential
+
+logger = logging.getLogger(__name__)
+
+
+# Fila de gravação em segundo plano: os formulários só registram a operação num
+# diário local (JSON Lines) e uma thread envia ao Google Sheets em lotes,
+# agrupando inserções por planilha e mantendo apenas o último Km_Atual de cada
+# veículo. Entradas só saem do diário depois de enviadas; se o processo cair,
+# o diário é reenviado na próxima inicialização.
+class FilaEscrita:
+    def __init__(self, enviar_linhas, enviar_km, arquivo, janela=1.0, intervalo_erro=30.0,
+                 tentativas=5):
+        self._enviar_linhas = enviar_linhas
+        self._enviar_km = enviar_km
+        self._arquivo = arquivo
+        self._janela = janela
+        self._intervalo_erro = intervalo_erro
+        self._tentativas = tentativas
+        self._trava = threading.Lock()
+        self._evento = threading.Event()
+        self._pendentes = self._ler_diario()
+        if self._pendentes:
+            self._evento.set()
+        self._thread = threading.Thread(target=self._executar, name='fila-escrita', daemon=True)
+        self._thread.start()
+
+    def enfileirar_linhas(self, worksheet, colunas, valores):
+        self._registrar({'tipo': 'linhas', 'worksheet': worksheet, 'colunas': colunas, 'valores': valores})
+
+    def enfileirar_km(self, veiculo, km):
+        self._registrar({'tipo': 'km', 'worksheet': 'Veiculos', 'veiculo': veiculo, 'km': float(km)})
+
+    def pendentes(self, worksheet=None):
+        with self._trava:
+            return sum(1 for entrada in self._pendentes
+                       if worksheet is None or entrada['worksheet'] == worksheet)
+
+    # Envia imediatamente tudo o que estiver pendente; retorna False se algo falhou
+    def descarregar(self):
+        with self._trava:
+            lote = list(self._pendentes)
+        if not lote:
+            return True
+
+        # Inserções agrupadas por planilha, na ordem em que foram registradas
+        por_planilha = {}
+        for entrada in lote:
+            if entrada['tipo'] == 'linhas':
+                por_planilha.setdefault(entrada['worksheet'], []).append(entrada)
+        for worksheet, entradas in por_planilha.items():
+            frames = [(worksheet, pd.DataFrame(entrada['valores'], columns=entrada['colunas']))
+                      for entrada in entradas]
+            if not self._com_tentativas(self._enviar_linhas, frames):
+                return False
+            self._concluir(entradas)
+
+        # Km_Atual depois das inserções (um veículo novo precisa existir na planilha)
+        entradas_km = [entrada for entrada in lote if entrada['tipo'] == 'km']
+        if entradas_km:
+            ultimo_km = {entrada['veiculo']: entrada['km'] for entrada in entradas_km}
+            if not self._com_tentativas(self._enviar_km, ultimo_km):
+                return False
+            self._concluir(entradas_km)
+        return True
+
+    def _com_tentativas(self, funcao, argumento):
+        try:
+            for tentativa in Retrying(stop=stop_after_attempt(self._tentativas),
+                                      wait=wait_exponential(multiplier=1, max=10), reraise=True):
+                with tentativa:
+                    funcao(argumento)
+        except Exception:
+            logger.exception("Falha ao enviar gravações pendentes ao Google Sheets")
+            return False
+        return True
+
+    def _executar(self):
+        while True:
+            self._evento.wait()
+            # Pequena janela para agrupar envios feitos em sequência
+            time.sleep(self._janela)
+            self._evento.clear()
+            if not self.descarregar():
+                time.sleep(self._intervalo_erro)
+                self._evento.set()
+
+    def _registrar(self, entrada):
+        entrada['id'] = uuid.uuid4().hex
+        with self._trava:
+            os.makedirs(os.path.dirname(self._arquivo) or '.', exist_ok=True)
+            with open(self._arquivo, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(json.dumps(entrada) + '\n')
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            self._pendentes.append(entrada)
+        self._evento.set()
+
+    def _concluir(self, entradas):
+        enviadas = {entrada['id'] for entrada in entradas}
+        with self._trava:
+            self._pendentes = [entrada for entrada in self._pendentes if entrada['id'] not in enviadas]
+            temporario = f'{self._arquivo}.tmp'
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                for entrada in self._pendentes:
+                    arquivo.write(json.dumps(entrada) + '\n')
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            os.replace(temporario, self._arquivo)
+
+    def _ler_diario(self):
+        pendentes = []
+        try:
+            with open(self._arquivo, encoding='utf-8') as arquivo:
+                for linha in arquivo:
+                    try:
+                        pendentes.append(json.loads(linha))
+                    except ValueError:
+                        # Linha incompleta: o processo caiu no meio da gravação
+                        logger.warning("Entrada corrompida ignorada no diário da fila de escrita")
+        except OSError:
+            pass
+        return pendentes
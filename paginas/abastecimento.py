@@ -0,0 +1,53 @@
+import pandas as pd
+import streamlit as st
+
+from dados import enqueue_append
+
+
+# Página de registro de abastecimentos
+def exibir(cadastro):
+    st.header("⛽ Registro de Abastecimento")
+
+    # Verificar se existem veículos cadastrados
+    if len(cadastro.df) == 0:
+        st.warning("Não há veículos cadastrados. Por favor, cadastre um veículo primeiro.")
+    else:
+        with st.form("registro_abastecimento"):
+            veiculo = st.selectbox("🚗 Selecione o Veículo", 
+                                cadastro.opcoes)
+        
+            # Encontrar km atual do veículo selecionado
+            km_ultimo = cadastro.km_atual(veiculo)
+        
+            col1, col2 = st.columns(2)
+            with col1:
+                data_abast = st.date_input("📅 Data do Abastecimento")
+                preco_comb = st.number_input("💰 Preço do Combustível (por litro)", 
+                                          min_value=0.0, step=0.01)
+                km_atual = st.number_input("🎯 Km Atual", step=1.0)
+            with col2:
+                qtd_litros = st.number_input("🛢️ Quantidade de Litros", 
+                                          min_value=0.0, step=0.1)
+                # Calcula o valor total automaticamente
+                valor_total = preco_comb * qtd_litros
+                st.markdown(f"💵 **Valor Total:** R$ {valor_total:.2f}")
+                if km_atual > km_ultimo:
+                    st.info(f"Distância percorrida desde último registro: {km_atual - km_ultimo:.1f} km")
+        
+            submitted = st.form_submit_button("💾 Salvar Dados")
+            if submitted:
+                new_data = pd.DataFrame({
+                    'Veículo': [veiculo],
+                    'Data': [pd.Timestamp(data_abast)], 
+                    'Preço': [preco_comb],
+                    'Litros': [qtd_litros],
+                    'Valor': [valor_total],
+                    'Km_Atual': [km_atual]
+                })
+            
+                enqueue_append(new_data, 'Abastecimentos')
+            
+                # Atualizar Km_Atual do veículo
+                cadastro.atualizar_km(veiculo, km_atual)
+            
+                st.success("Abastecimento registrado com sucesso!")
@@ -0,0 +1,29 @@
+import pandas as pd
+import streamlit as st
+
+
+# Página de cadastro de veículos
+def exibir(cadastro):
+    st.header("📝 Cadastro de Veículo")
+
+    with st.form("cadastro_veiculo"):
+        col1, col2 = st.columns(2)
+        with col1:
+            nome = st.text_input("🚗 Nome do Veículo")
+            marca = st.text_input("🏢 Marca do Veículo")
+        with col2:
+            km_inicial = st.number_input("📏 Km Inicial", min_value=0)
+            data_registro = st.date_input("📅 Data de Registro")
+    
+        submitted = st.form_submit_button("💾 Salvar Dados")
+        if submitted:
+            # Corrigido para incluir Km_Atual igual a Km_Inicial
+            new_data = pd.DataFrame({
+                'Nome': [nome],
+                'Marca': [marca],
+                'Km_Inicial': [km_inicial],
+                'Km_Atual': [km_inicial],
+                'Data_Registro': [pd.Timestamp(data_registro)]
+            })
+            cadastro.registrar(new_data)
+            st.success("Veículo cadastrado com sucesso!")
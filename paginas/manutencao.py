@@ -0,0 +1,48 @@
+import pandas as pd
+import streamlit as st
+
+from dados import enqueue_append
+
+
+# Página de registro de manutenções
+def exibir(cadastro):
+    st.header("🔧 Registro de Manutenção")
+
+    # Verificar se existem veículos cadastrados
+    if len(cadastro.df) == 0:
+        st.warning("Não há veículos cadastrados. Por favor, cadastre um veículo primeiro.")
+    else:
+        with st.form("registro_manutencao"):
+            veiculo = st.selectbox("🚗 Selecione o Veículo", 
+                                cadastro.opcoes)
+        
+            # Encontrar km atual do veículo selecionado
+            km_ultimo = cadastro.km_atual(veiculo)
+        
+            col1, col2 = st.columns(2)
+            with col1:
+                data_manut = st.date_input("📅 Data da Manutenção")
+                preco = st.number_input("💰 Preço", min_value=0.0, step=0.01)
+                km_atual = st.number_input("🎯 Km Atual", min_value=float(km_ultimo), 
+                                        value=float(km_ultimo), step=1.0)
+            with col2:
+                descricao = st.text_area("📝 Descrição da Manutenção")
+                if km_atual > km_ultimo:
+                    st.info(f"Distância percorrida desde último registro: {km_atual - km_ultimo:.1f} km")
+        
+            submitted = st.form_submit_button("💾 Salvar Dados")
+            if submitted:
+                new_data = pd.DataFrame({
+                    'Veículo': [veiculo],
+                    'Data': [pd.Timestamp(data_manut)],
+                    'Valor': [preco],
+                    'Descricao': [descricao],
+                    'Km_Atual': [km_atual]
+                })
+            
+                enqueue_append(new_data, 'Manutencoes')
+            
+                # Atualizar Km_Atual do veículo
+                cadastro.atualizar_km(veiculo, km_atual)
+            
+                st.success("Manutenção registrada com sucesso!")
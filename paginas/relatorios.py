@@ -0,0 +1,228 @@
+import plotly.express as px
+import streamlit as st
+
+import cache_local
+import diagnostico
+import relatorio
+from dados import load_data, data_versions
+
+
+# Página de relatórios: métricas e gráficos do período escolhido
+def exibir(cadastro):
+    st.header("📊 Relatórios")
+
+    # Os relatórios são lidos da cópia local; o botão força nova leitura do Google Sheets
+    if st.button("🔄 Atualizar dados"):
+        cache_local.invalidar()
+        relatorio.limpar_cache()
+
+    # Carregar dados para relatórios
+    try:
+        versao_abast, versao_manut = data_versions(['Abastecimentos', 'Manutencoes'])
+    
+        # Verificar se temos dados suficientes
+        if relatorio.sem_dados(load_data, versao_abast, versao_manut):
+            st.warning("Não há dados suficientes para gerar relatórios. Por favor, registre abastecimentos e manutenções.")
+            st.stop()
+        
+    except:
+        st.error("Erro ao carregar dados dos relatórios")
+        st.stop()
+
+    # Seletor de período
+    periodo_opcoes = relatorio.opcoes_periodo()
+
+    periodo = st.selectbox("📅 Selecione o período", options=list(periodo_opcoes.keys()))
+
+    # Filtros, consumo e agrupamentos são memorizados por versão dos dados e período
+    dados = relatorio.calcular_relatorio(load_data, versao_abast, versao_manut, periodo_opcoes[periodo])
+
+    # Criar cards de métricas em duas linhas
+    st.markdown("### 📊 Métricas Gerais")
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        total_litros = dados['total_litros']
+        st.markdown(f"""
+            <div class="big-metric">
+                CONSUMO TOTAL DE LITROS<br>
+                {total_litros:.2f} L
+            </div>
+        """, unsafe_allow_html=True)
+
+    with col2:
+        total_gasto_comb = dados['total_gasto_comb']
+        st.markdown(f"""
+            <div class="big-metric">
+                GASTO TOTAL COM COMBUSTÍVEL<br>
+                R$ {total_gasto_comb:.2f}
+            </div>
+        """, unsafe_allow_html=True)
+
+    with col3:
+        total_gasto_manut = dados['total_gasto_manut']
+        st.markdown(f"""
+            <div class="big-metric">
+                GASTO TOTAL COM MANUTENÇÃO<br>
+                R$ {total_gasto_manut:.2f}
+            </div>
+        """, unsafe_allow_html=True)
+
+    # Nova linha para consumo médio
+    if not dados['abast_vazio']:
+        consumo_medio_veiculos = dados['consumo_medio']
+        st.markdown("### 🚗 Consumo Médio por Veículo")
+    
+        # Criar colunas dinamicamente baseado no número de veículos
+        cols = st.columns(len(consumo_medio_veiculos))
+    
+        # Mostrar consumo médio para cada veículo
+        for idx, (veiculo, consumo_medio) in enumerate(consumo_medio_veiculos.items()):
+            with cols[idx]:
+                st.markdown(f"""
+                    <div class="big-metric">
+                        {veiculo}<br>
+                        {consumo_medio:.2f} km/L
+                    </div>
+                """, unsafe_allow_html=True)
+
+    # Gráficos
+    st.markdown("### 📈 Gráficos")
+
+    # Verifica se temos dados para gráficos
+    if dados['abast_vazio'] and dados['manut_vazio']:
+        st.info("Não há dados suficientes para gerar gráficos.")
+    else:
+        # Históricos longos são resumidos; o intervalo escolhido aqui funciona como zoom
+        # e volta à resolução completa quando contém poucos pontos
+        zoom = None
+        if dados.get('pontos_graficos', 0) > relatorio.LIMITE_PONTOS and 'datas_graficos' in dados:
+            data_inicial, data_final = (data.date() for data in dados['datas_graficos'])
+            if data_inicial < data_final:
+                zoom = st.slider("🔍 Intervalo dos gráficos", min_value=data_inicial, max_value=data_final,
+                                 value=(data_inicial, data_final), format="DD/MM/YYYY")
+        graficos = relatorio.series_graficos(load_data, versao_abast, versao_manut,
+                                             periodo_opcoes[periodo], zoom)
+    
+        # NOVO GRÁFICO DE CONSUMO KM/L AO LONGO DO TEMPO
+        if not dados['abast_vazio'] and len(graficos['consumo_df']) > 0:
+            with diagnostico.medir('grafico.consumo', linhas=len(graficos['consumo_df'])):
+                st.subheader("📊 Consumo (km/L) ao Longo do Tempo por Veículo")
+                if graficos['resolucao_consumo']:
+                    st.caption(f"Exibindo os abastecimentos de menor e maior consumo de cada "
+                               f"{graficos['resolucao_consumo']}. Reduza o intervalo para ver todos.")
+        
+                # Criar o gráfico de barras de consumo
+                fig_consumo = px.bar(
+                    graficos['consumo_df'],
+                    x='Data_formatada',
+                    y='Consumo_km_l',
+                    color='Veículo',
+                    barmode='group',
+                    title='CONSUMO (KM/L) AO LONGO DO TEMPO',
+                    hover_data={
+                        'Data_formatada': True,
+                        'Veículo': True,
+                        'Consumo_km_l': ':.2f',
+                        'Km_Atual': True,
+                        'Litros': True
+                    },
+                    height=500
+                )
+        
+                fig_consumo.update_layout(
+                    xaxis_title="Data do Abastecimento",
+                    yaxis_title="Consumo (km/L)",
+                    legend_title="Veículo",
+                    xaxis={'categoryorder': 'category ascending'},
+                    hovermode='closest',
+                    xaxis_tickangle=-45
+                )
+        
+                # Adicionar linha com o consumo médio de cada veículo
+                for veiculo, consumo_medio in consumo_medio_veiculos.items():
+                    if consumo_medio > 0:
+                        fig_consumo.add_shape(
+                            type="line",
+                            x0=0,
+                            y0=consumo_medio,
+                            x1=1,
+                            y1=consumo_medio,
+                            xref="paper",
+                            line=dict(color="rgba(0,0,0,0.5)", dash="dash"),
+                        )
+                        fig_consumo.add_annotation(
+                            x=0.02,
+                            y=consumo_medio,
+                            xref="paper",
+                            text=f"Média {veiculo}: {consumo_medio:.1f} km/L",
+                            showarrow=False,
+                            bgcolor="rgba(0, 4, 255, 0.8)",
+                            font=dict(size=10)
+                        )
+        
+                st.plotly_chart(fig_consumo, use_container_width=True)
+    
+        # Outros gráficos em duas colunas
+        col1, col2 = st.columns(2)
+    
+        # Gráficos de Abastecimento
+        if not dados['abast_vazio']:
+            with col1, diagnostico.medir('grafico.litros_por_dia', linhas=len(graficos['abast_diario'])):
+                if graficos['resolucao_diario']:
+                    st.caption(f"Exibindo os dias de menor e maior volume de cada "
+                               f"{graficos['resolucao_diario']}. Reduza o intervalo para ver todos.")
+            
+                # Criar o gráfico de linhas (litros agrupados por data e veículo)
+                fig_comb = px.line(graficos['abast_diario'],
+                                x='Dia',
+                                y='Litros',
+                                color='Veículo',
+                                title='DATAS DE ABASTECIMENTO POR VEÍCULO',
+                                markers=True)
+
+                fig_comb.update_layout(
+                    xaxis_title="Dia",
+                    yaxis_title="Litros",
+                    hovermode='x unified'
+                )
+
+                st.plotly_chart(fig_comb, use_container_width=True)
+        
+            with col2, diagnostico.medir('grafico.litros_por_veiculo', linhas=len(dados['litros_por_veiculo'])):
+                # Gráfico de barras - Consumo de litros por veículo
+                fig_litros = px.bar(dados['litros_por_veiculo'],
+                                x='Veículo',
+                                y='Litros',
+                                title='CONSUMO TOTAL DE LITROS POR VEÍCULO')
+                fig_litros.update_layout(
+                    xaxis_title="Veículo",
+                    yaxis_title="Litros"
+                )
+                st.plotly_chart(fig_litros, use_container_width=True)
+            
+        # Gráficos de Manutenção
+        if not dados['manut_vazio']:
+            with col1, diagnostico.medir('grafico.manutencao_por_veiculo', linhas=len(dados['manut_por_veiculo'])):
+                # Gráfico de pizza - Gastos com manutenção por veículo
+                fig_manut_pizza = px.pie(dados['manut_por_veiculo'],
+                                        values='Valor',
+                                        names='Veículo',
+                                        title='GASTO COM MANUTENÇÃO POR VEÍCULO')
+                st.plotly_chart(fig_manut_pizza, use_container_width=True)
+        
+            with col2, diagnostico.medir('grafico.manutencao_mensal', linhas=len(dados['manut_mensal'])):
+                # Gráfico de linha - Gastos com manutenção por veículo
+                fig_manut = px.line(dados['manut_mensal'],
+                                x='Mês',
+                                y='Valor',
+                                color='Veículo',
+                                title='GASTO COM MANUTENÇÃO POR VEÍCULO',
+                                markers=True)
+            
+                fig_manut.update_layout(
+                    xaxis_title="Mês",
+                    yaxis_title="Valor (R$)",
+                    hovermode='x unified'
+                )
+                st.plotly_chart(fig_manut, use_container_width=True)
@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import agregados
+import diagnostico
+import consumo
+from consumo import calcular_consumo
+
+
+# Opções do seletor de período, com a data inicial de cada uma já calculada
+def opcoes_periodo():
+    mes_atual = pd.Timestamp.now().normalize().replace(day=1)
+    return {
+        "Todo o período": None,
+        "Mês atual": mes_atual,
+        "Últimos 3 meses": mes_atual - pd.DateOffset(months=3),
+        "Últimos 6 meses": mes_atual - pd.DateOffset(months=6),
+        "Este ano": mes_atual.replace(month=1)
+    }
+
+
+# Recorta as linhas de `inicio` até `fim` (exclusivo) por busca binária
+# (df ordenado pela coluna de data)
+def _filtrar_periodo(df, inicio, coluna='Data', fim=None):
+    if df.empty or (inicio is None and fim is None):
+        return df
+    datas = df[coluna]
+    posicao_inicio = 0 if inicio is None else datas.searchsorted(inicio, side='left')
+    if fim is None:
+        # Datas inválidas (NaT) ficam no fim da ordenação e nunca entram em um período
+        posicao_fim = datas.searchsorted(pd.Timestamp.max, side='right')
+    else:
+        posicao_fim = datas.searchsorted(fim, side='left')
+    return df.iloc[posicao_inicio:posicao_fim]
+
+
+# Formata cada data distinta uma única vez, em vez de uma vez por linha
+def _formatar_datas(datas, formato):
+    codigos, unicos = pd.factorize(datas)
+    formatados = np.append(pd.DatetimeIndex(unicos).strftime(formato).to_numpy(dtype=object), None)
+    return pd.Series(formatados[codigos], index=datas.index)
+
+
+# Planilha já tipada por load_data, ordenada por data para os recortes de período;
+# memorizada por versão dos dados
+@diagnostico.cronometrar('relatorio.carregar_normalizado', cache=True)
+@st.cache_data(show_spinner=False, max_entries=8)
+def carregar_normalizado(_carregar, worksheet, versao):
+    diagnostico.anotar(cache=False)
+    df = _carregar(worksheet)
+    return df.sort_values('Data', kind='stable', na_position='last', ignore_index=True)
+
+
+# Indica se não há nenhum registro de abastecimento ou manutenção
+@diagnostico.cronometrar('relatorio.sem_dados', cache=True)
+@st.cache_data(show_spinner=False, max_entries=8)
+def sem_dados(_carregar, versao_abast, versao_manut):
+    diagnostico.anotar(cache=False)
+    return (agregados.carregar('Abastecimentos', versao_abast, _carregar).empty
+            and agregados.carregar('Manutencoes', versao_manut, _carregar).empty)
+
+
+# Todos os números e séries exibidos na página de relatórios, memorizados por
+# versão das planilhas e período selecionado. Totais e séries são consultas
+# DuckDB sobre os agregados (período × veículo); só o consumo por abastecimento
+# precisa das linhas brutas
+@diagnostico.cronometrar('relatorio.calcular_relatorio', cache=True)
+@st.cache_data(show_spinner=False, max_entries=32)
+def calcular_relatorio(_carregar, versao_abast, versao_manut, inicio_periodo):
+    diagnostico.anotar(cache=False)
+    import consultas  # DuckDB só é carregado quando um relatório é calculado
+    relatorio = consultas.resumir(agregados.carregar('Abastecimentos', versao_abast, _carregar),
+                                  agregados.carregar('Manutencoes', versao_manut, _carregar),
+                                  inicio_periodo)
+
+    if not relatorio['abast_vazio']:
+        if inicio_periodo is None:
+            # Todo o período: consumo mantido incrementalmente a cada abastecimento
+            consumo_df, consumo_medio = consumo.carregar(versao_abast, _carregar)
+        else:
+            abast_df = _filtrar_periodo(carregar_normalizado(_carregar, 'Abastecimentos', versao_abast),
+                                        inicio_periodo)
+            consumo_df, consumo_medio = calcular_consumo(abast_df)
+        relatorio['consumo_df'] = consumo_df
+        relatorio['consumo_medio'] = consumo_medio
+
+        # Intervalo de datas e tamanho das séries dos gráficos, para o seletor de zoom
+        abast_diario = relatorio['abast_diario']
+        if not abast_diario.empty:
+            relatorio['datas_graficos'] = (abast_diario['Dia'].iloc[0], abast_diario['Dia'].iloc[-1])
+        relatorio['pontos_graficos'] = max(len(consumo_df), len(abast_diario))
+
+    return relatorio
+
+
+# Número máximo de pontos por gráfico enviados ao navegador
+LIMITE_PONTOS = 1500
+
+# Menor número de intervalos por veículo ao reduzir uma série; com mais veículos
+# do que isso permite, só os de mais registros são exibidos
+INTERVALOS_MINIMOS = 10
+
+
+# Duração de cada intervalo para a legenda do gráfico, na maior unidade que couber
+def _descrever_duracao(duracao):
+    for unidade, singular, plural in (('D', 'dia', 'dias'), ('h', 'hora', 'horas'), ('min', 'minuto', 'minutos')):
+        quantidade = round(duracao / pd.Timedelta(1, unit=unidade))
+        if quantidade >= 1 or unidade == 'min':
+            return f'1 {singular}' if quantidade <= 1 else f'{quantidade} {plural}'
+
+
+# Reduz a série a no máximo `limite` pontos: agrupa por semana (ou mês, se ainda
+# passar do limite) e mantém, em cada grupo de cada veículo, só as linhas de
+# mínimo e máximo, para que picos e quedas continuem visíveis no gráfico. Se nem
+# por mês couber, divide o período em intervalos de mesma duração, tantos quantos
+# cabem no limite; com veículos demais para INTERVALOS_MINIMOS cada, exibe só os
+# veículos com mais registros.
+# Retorna a série e a resolução usada (None quando exibida por completo)
+def reduzir_serie(df, coluna_data, coluna_valor, limite=LIMITE_PONTOS):
+    if len(df) <= limite:
+        return df, None
+    veiculos = max(df['Veículo'].nunique(), 1)
+    chaves = None
+    for frequencia, resolucao in (('W', 'semana'), ('M', 'mês')):
+        grupos = df[coluna_data].dt.to_period(frequencia)
+        if 2 * grupos.nunique() * veiculos <= limite:
+            chaves = [grupos, df['Veículo']]
+            break
+    if chaves is None:
+        exibidos = ''
+        maximo = max(limite // (2 * INTERVALOS_MINIMOS), 1)
+        if veiculos > maximo:
+            mantidos = df['Veículo'].value_counts().index[:maximo]
+            df = df[df['Veículo'].isin(mantidos)]
+            exibidos = f', para os {maximo} veículos com mais registros (de {veiculos})'
+            veiculos = maximo
+        intervalos = limite // (2 * veiculos)
+        chaves = [pd.cut(df[coluna_data], intervalos, labels=False), df['Veículo']]
+        duracao = (df[coluna_data].max() - df[coluna_data].min()) / intervalos
+        resolucao = f'intervalo de {_descrever_duracao(duracao)}{exibidos}'
+    valores = df.groupby(chaves, observed=True, sort=False)[coluna_valor]
+    extremos = pd.unique(np.concatenate([valores.idxmin().dropna().to_numpy(),
+                                         valores.idxmax().dropna().to_numpy()]))
+    return df.loc[extremos].sort_values(coluna_data, kind='stable'), resolucao
+
+
+# Séries dos gráficos de consumo e de litros por dia, recortadas pelo zoom
+# (intervalo de datas escolhido na página) e reduzidas quando muito longas
+@diagnostico.cronometrar('relatorio.series_graficos', cache=True)
+@st.cache_data(show_spinner=False, max_entries=32)
+def series_graficos(_carregar, versao_abast, versao_manut, inicio_periodo, zoom=None):
+    diagnostico.anotar(cache=False)
+    relatorio = calcular_relatorio(_carregar, versao_abast, versao_manut, inicio_periodo)
+    if relatorio['abast_vazio']:
+        return {}
+    consumo_df = relatorio['consumo_df']
+    abast_diario = relatorio['abast_diario']
+    if zoom is not None:
+        inicio, fim = pd.Timestamp(zoom[0]), pd.Timestamp(zoom[1]) + pd.Timedelta(days=1)
+        consumo_df = _filtrar_periodo(consumo_df, inicio, 'Data', fim)
+        abast_diario = _filtrar_periodo(abast_diario, inicio, 'Dia', fim)
+
+    consumo_df, resolucao_consumo = reduzir_serie(consumo_df, 'Data', 'Consumo_km_l')
+    consumo_df = consumo_df.copy()
+    consumo_df['Data_formatada'] = _formatar_datas(consumo_df['Data'], '%d/%m/%Y')
+    abast_diario, resolucao_diario = reduzir_serie(abast_diario, 'Dia', 'Litros')
+    return {
+        'consumo_df': consumo_df,
+        'resolucao_consumo': resolucao_consumo,
+        'abast_diario': abast_diario,
+        'resolucao_diario': resolucao_diario,
+    }
+
+
+# Descarta os resultados memorizados (chamado sempre que dados são gravados)
+def limpar_cache():
+    carregar_normalizado.clear()
+    sem_dados.clear()
+    calcular_relatorio.clear()
+    series_graficos.clear()
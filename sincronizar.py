@@ -0,0 +1,48 @@
+# Copia os registros entre o Google Sheets e o banco SQLite local, nas duas direções.
+#
+#   python sincronizar.py importar                  # Google Sheets -> SQLite
+#   python sincronizar.py exportar                  # SQLite -> Google Sheets
+#   python sincronizar.py importar --planilhas Abastecimentos --banco frota.db
+#
+# Cada planilha copiada substitui inteiramente o conteúdo do destino. Para usar o
+# banco no app, defina GERENCIADOR_ARMAZENAMENTO=sqlite (e GERENCIADOR_SQLITE
+# com o caminho do arquivo, se não for o padrão).
+import argparse
+
+import armazenamento
+import dados
+import esquema
+
+
+def importar(banco, planilhas):
+    for worksheet in planilhas:
+        data = dados._ler_planilha(worksheet, ttl=0, compacto=False)
+        banco.substituir(worksheet, data)
+        print(f'{worksheet}: {len(data)} registros importados')
+
+
+def exportar(banco, planilhas):
+    for worksheet in planilhas:
+        data = banco.ler(worksheet, compacto=False)
+        dados._conexao().update(worksheet=worksheet, data=esquema.desnormalizar(data, worksheet))
+        print(f'{worksheet}: {len(data)} registros exportados')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sincroniza o Google Sheets com o banco SQLite local')
+    parser.add_argument('direcao', choices=['importar', 'exportar'],
+                        help='importar: Google Sheets -> SQLite; exportar: SQLite -> Google Sheets')
+    parser.add_argument('--planilhas', nargs='+', choices=list(esquema.ESQUEMAS),
+                        default=list(esquema.ESQUEMAS))
+    parser.add_argument('--banco', default=armazenamento.ARQUIVO_SQLITE, help='arquivo do banco SQLite')
+    args = parser.parse_args()
+
+    banco = armazenamento.ArmazenamentoSQLite(args.banco)
+    if args.direcao == 'importar':
+        importar(banco, args.planilhas)
+    else:
+        exportar(banco, args.planilhas)
+
+
+if __name__ == '__main__':
+    main()
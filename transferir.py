@@ -0,0 +1,230 @@
+# Importa e exporta históricos inteiros em CSV ou Parquet, em blocos, sem
+# carregar o arquivo ou a planilha inteira na memória.
+#
+#   python transferir.py importar abastecimentos.csv --planilha Abastecimentos
+#   python transferir.py exportar manutencoes.parquet --planilha Manutencoes
+#   python transferir.py importar frota.parquet --planilha Veiculos --lote 20000
+#
+# Os registros vão para o armazenamento configurado para o app (Google Sheets
+# ou banco SQLite, ver GERENCIADOR_ARMAZENAMENTO), acrescentados ao final em
+# uma gravação por bloco. As colunas seguem os nomes da planilha; linhas com
+# valores inválidos, sem campos obrigatórios ou de veículos não cadastrados
+# são descartadas e listadas no fim. Depois de importar abastecimentos ou
+# manutenções, o Km_Atual de cada veículo passa a ser o maior Km importado.
+import argparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import armazenamento
+import cache_local
+import dados
+import esquema
+
+# Linhas por bloco lido e gravado
+LOTE = 50_000
+
+# Campos sem os quais o registro é descartado
+_OBRIGATORIAS = {
+    'Veiculos': ['Nome'],
+    'Abastecimentos': ['Veículo', 'Data'],
+    'Manutencoes': ['Veículo', 'Data'],
+}
+
+# Quantas linhas descartadas listar ao fim da importação
+_EXEMPLOS = 10
+
+
+def _formato(arquivo):
+    formato = arquivo.rsplit('.', 1)[-1].lower()
+    if formato not in ('csv', 'parquet'):
+        raise ValueError(f'{arquivo}: formato não suportado (use .csv ou .parquet)')
+    return formato
+
+
+# Blocos do arquivo como vieram (CSV lido como texto; o esquema converte depois)
+def _ler_arquivo(arquivo, tamanho):
+    if _formato(arquivo) == 'csv':
+        yield from pd.read_csv(arquivo, dtype=str, chunksize=tamanho)
+    else:
+        for bloco in pq.ParquetFile(arquivo).iter_batches(batch_size=tamanho):
+            yield bloco.to_pandas()
+
+
+def _conferir_colunas(bloco, worksheet):
+    renomear = {planilha: coluna for coluna, planilha in esquema.COLUNAS_PLANILHA.get(worksheet, {}).items()}
+    colunas = {renomear.get(coluna, coluna) for coluna in bloco.columns}
+    faltando = [coluna for coluna in _OBRIGATORIAS[worksheet] if coluna not in colunas]
+    if faltando:
+        raise ValueError(f'colunas obrigatórias ausentes: {", ".join(faltando)}')
+    ignoradas = sorted(colunas - set(esquema.ESQUEMAS[worksheet]))
+    if ignoradas:
+        print(f'Colunas ignoradas: {", ".join(ignoradas)}')
+
+
+# Separa as linhas válidas do bloco; devolve (válidas normalizadas, [(linha, motivo)]).
+# Os números ficam em float64, como vieram do arquivo, para serem gravados sem perda.
+# `primeira_linha` é a linha do arquivo onde o bloco começa, para os relatos
+def _validar(bloco, worksheet, veiculos, primeira_linha):
+    bruto = bloco.mask(bloco == '').dropna(how='all')
+    linhas = bruto.index.to_numpy() - bloco.index[0] + primeira_linha
+    normalizado = esquema.normalizar(bruto, worksheet, compacto=False)
+    renomeado = bruto.rename(columns={planilha: coluna for coluna, planilha
+                                      in esquema.COLUNAS_PLANILHA.get(worksheet, {}).items()})
+
+    motivos = pd.Series(None, index=normalizado.index, dtype=object)
+    for coluna in esquema.ESQUEMAS[worksheet]:
+        if coluna in renomeado.columns:
+            # Preenchido no arquivo mas vazio depois da conversão: valor inválido
+            invalido = renomeado[coluna].notna().to_numpy() & normalizado[coluna].isna().to_numpy()
+            motivos = motivos.mask(invalido & motivos.isna(), f'{coluna} inválido')
+    for coluna in _OBRIGATORIAS[worksheet]:
+        motivos = motivos.mask(normalizado[coluna].isna() & motivos.isna(), f'{coluna} vazio')
+
+    if worksheet == 'Veiculos':
+        repetido = normalizado['Nome'].isin(veiculos) | normalizado['Nome'].duplicated()
+        motivos = motivos.mask(repetido & motivos.isna(), 'veículo já cadastrado')
+        # Como no cadastro pelo app, o Km atual começa igual ao inicial
+        normalizado['Km_Atual'] = normalizado['Km_Atual'].fillna(normalizado['Km_Inicial'])
+    else:
+        desconhecido = ~normalizado['Veículo'].astype(object).isin(veiculos)
+        motivos = motivos.mask(desconhecido & motivos.isna(), 'veículo não cadastrado')
+
+    rejeitadas = list(zip(linhas[motivos.notna().to_numpy()], motivos.dropna()))
+    return normalizado[motivos.isna().to_numpy()].reset_index(drop=True), rejeitadas
+
+
+def _gravar(banco, data, worksheet):
+    if banco is not None:
+        banco.acrescentar(worksheet, data)
+    else:
+        dados._enviar_linhas(data, worksheet)
+
+
+def _ler_veiculos(banco):
+    if banco is not None:
+        return banco.ler('Veiculos', compacto=False)
+    return dados._ler_planilha('Veiculos', ttl=0, compacto=False)
+
+
+# Km_Atual de cada veículo passa ao maior Km importado, quando maior que o atual
+def _atualizar_km(banco, km_importado):
+    veiculos = _ler_veiculos(banco).set_index('Nome')['Km_Atual']
+    atual = veiculos.reindex(km_importado.index)
+    maiores = km_importado[atual.isna() | (km_importado > atual)]
+    atualizacoes = {nome: float(km) for nome, km in maiores.items()}
+    if atualizacoes:
+        if banco is not None:
+            banco.atualizar_km(atualizacoes)
+        else:
+            dados.update_km_cells(atualizacoes)
+    return len(atualizacoes)
+
+
+def importar(arquivo, worksheet, tamanho=LOTE):
+    banco = armazenamento.banco()
+    veiculos = set(_ler_veiculos(banco)['Nome'].dropna())
+    km_por_lote = []
+    importadas = 0
+    descartadas = 0
+    exemplos = []
+    primeira_linha = 2  # linha 1 do arquivo é o cabeçalho
+    try:
+        for bloco in _ler_arquivo(arquivo, tamanho):
+            if primeira_linha == 2:
+                _conferir_colunas(bloco, worksheet)
+            validas, descartes = _validar(bloco, worksheet, veiculos, primeira_linha)
+            primeira_linha += len(bloco)
+            descartadas += len(descartes)
+            exemplos.extend(descartes[:_EXEMPLOS - len(exemplos)])
+            if validas.empty:
+                continue
+            _gravar(banco, validas, worksheet)
+            importadas += len(validas)
+            if worksheet == 'Veiculos':
+                veiculos.update(validas['Nome'])
+            else:
+                km_por_lote.append(validas.groupby('Veículo', observed=True)['Km_Atual'].max())
+            print(f'{worksheet}: {importadas} registros importados')
+    finally:
+        # Cópia local, agregados e consumo são refeitos a partir do armazenamento
+        if importadas:
+            cache_local.invalidar(worksheet)
+            dados._invalidar_derivados(worksheet)
+
+    km_importado = pd.concat(km_por_lote).astype('float64').dropna() if km_por_lote else None
+    if km_importado is not None and not km_importado.empty:
+        atualizados = _atualizar_km(banco, km_importado.groupby(level=0, observed=True).max())
+        cache_local.invalidar('Veiculos')
+        print(f'Km_Atual atualizado em {atualizados} veículos')
+    if descartadas:
+        print(f'{descartadas} linhas descartadas' + (', entre elas:' if descartadas > len(exemplos) else ':'))
+        for linha, motivo in exemplos:
+            print(f'  linha {linha}: {motivo}')
+    return importadas, descartadas
+
+
+# Blocos da planilha no armazenamento configurado, normalizados com os números em float64
+def _ler_armazenamento(worksheet, tamanho):
+    banco = armazenamento.banco()
+    if banco is not None:
+        yield from banco.ler_em_lotes(worksheet, tamanho, compacto=False)
+        return
+    planilha, cabecalho = dados._planilha(worksheet)
+    for primeira in range(2, planilha.row_count + 1, tamanho):
+        linhas = dados._ler_linhas(planilha, primeira, primeira + tamanho - 1)
+        if linhas:
+            yield dados._frame_linhas(linhas, cabecalho, worksheet, compacto=False)
+
+
+# Tipos fixos no Parquet (texto e números), iguais em todos os blocos
+def _esquema_arrow(worksheet):
+    renomear = esquema.COLUNAS_PLANILHA.get(worksheet, {})
+    return pa.schema([(renomear.get(coluna, coluna), pa.float64() if tipo == 'numero' else pa.string())
+                      for coluna, tipo in esquema.ESQUEMAS[worksheet].items()])
+
+
+def exportar(arquivo, worksheet, tamanho=LOTE):
+    formato = _formato(arquivo)
+    schema = _esquema_arrow(worksheet)
+    escritor = pq.ParquetWriter(arquivo, schema) if formato == 'parquet' else None
+    exportadas = 0
+    try:
+        for bloco in _ler_armazenamento(worksheet, tamanho):
+            # Mesmo formato gravado na planilha, para que o arquivo possa ser reimportado
+            linhas = esquema.desnormalizar(bloco, worksheet).reindex(columns=schema.names)
+            if escritor is not None:
+                escritor.write_table(pa.Table.from_pandas(linhas, schema=schema, preserve_index=False))
+            else:
+                linhas.to_csv(arquivo, mode='w' if exportadas == 0 else 'a', header=exportadas == 0,
+                              index=False)
+            exportadas += len(linhas)
+            print(f'{worksheet}: {exportadas} registros exportados')
+        if escritor is None and exportadas == 0:
+            pd.DataFrame(columns=schema.names).to_csv(arquivo, index=False)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return exportadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importa e exporta registros em CSV ou Parquet')
+    parser.add_argument('direcao', choices=['importar', 'exportar'])
+    parser.add_argument('arquivo', help='arquivo .csv ou .parquet')
+    parser.add_argument('--planilha', required=True, choices=list(esquema.ESQUEMAS))
+    parser.add_argument('--lote', type=int, default=LOTE, help='linhas por bloco lido e gravado')
+    args = parser.parse_args()
+
+    try:
+        if args.direcao == 'importar':
+            importar(args.arquivo, args.planilha, args.lote)
+        else:
+            exportar(args.arquivo, args.planilha, args.lote)
+    except ValueError as erro:
+        parser.error(str(erro))
+
+
+if __name__ == '__main__':
+    main()
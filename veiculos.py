@@ -0,0 +1,87 @@
+import threading
+
+import pandas as pd
+import streamlit as st
+
+import dados
+import esquema
+
+
+# Cadastro de veículos único no processo, lido por todas as sessões: a tabela,
+# um índice nome -> linha e a lista de opções dos formulários. Cada mudança
+# monta um estado novo e o troca de uma vez, então quem está lendo nunca vê
+# um estado pela metade; o estado antigo não é alterado
+class VeiculosCompartilhados:
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._estado = self._montar(esquema.normalizar(pd.DataFrame(), 'Veiculos'))
+        # Versão da planilha (dados.data_version) de onde o estado veio
+        self.versao = None
+
+    @staticmethod
+    def _montar(df):
+        indice = {}
+        for idx, nome in zip(df.index, df['Nome']):
+            indice.setdefault(nome, idx)  # nomes repetidos: vale o primeiro cadastro
+        return df, indice, df['Nome'].tolist()
+
+    # Recarrega a planilha só quando a versão mudou (gravação de outra sessão ou
+    # releitura do Google Sheets); uma leitura serve a todas as sessões
+    def sincronizar(self, versao):
+        if versao != self.versao:
+            with self._trava:
+                if versao != self.versao:
+                    self._estado = self._montar(dados.load_data('Veiculos'))
+                    self.versao = versao
+        return self
+
+    @property
+    def df(self):
+        return self._estado[0]
+
+    @property
+    def opcoes(self):
+        return self._estado[2]
+
+    def km_atual(self, nome):
+        df, indice, _ = self._estado
+        return df.at[indice[nome], 'Km_Atual']
+
+    # Grava novos veículos e os inclui no estado compartilhado
+    def registrar(self, novos):
+        with self._trava:
+            dados.enqueue_append(novos, 'Veiculos')
+            df, indice, opcoes = self._estado
+            df = pd.concat([df, esquema.normalizar(novos, 'Veiculos')], ignore_index=True)
+            indice, opcoes = dict(indice), list(opcoes)
+            for idx, nome in zip(df.index[-len(novos):], df['Nome'].iloc[-len(novos):]):
+                indice.setdefault(nome, idx)
+                opcoes.append(nome)
+            self._estado = df, indice, opcoes
+            self.versao = dados.data_version('Veiculos')
+
+    def atualizar_km(self, nome, km):
+        with self._trava:
+            df, indice, opcoes = self._estado
+            df = df.copy()
+            df.at[indice[nome], 'Km_Atual'] = km
+            dados.enqueue_km_update(nome, km, df)
+            self._estado = df, indice, opcoes
+            self.versao = dados.data_version('Veiculos')
+
+
+@st.cache_resource
+def _compartilhados():
+    return VeiculosCompartilhados()
+
+
+# Cadastro compartilhado, atualizado para a versão atual da planilha; se a
+# leitura falhar, segue com o último estado carregado
+def carregar(versao=None):
+    compartilhados = _compartilhados()
+    try:
+        if versao is None:
+            versao = dados.data_version('Veiculos')
+        return compartilhados.sincronizar(versao)
+    except Exception:
+        return compartilhados